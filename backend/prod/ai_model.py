@@ -1,12 +1,17 @@
+import json
+import logging
 import os
+import platform
 import re
+from concurrent.futures import ThreadPoolExecutor
 import unicodedata
 import numpy as np
 import polars as pl
 from joblib import load
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 from sentence_transformers import SentenceTransformer
 import faiss
+import torch
 try:
     from rerankers import CrossEncoderReranker, ColBERTReranker
 except ImportError:
@@ -17,7 +22,16 @@ except ImportError:
     except ImportError:
         CrossEncoderReranker = None
         ColBERTReranker = None
-from config import ARTIF_DIR, MODEL_DIR, FE_PATH, RERANKER_MODE, TOPK_RECALL_DEFAULT, TOPK_RETURN_DEFAULT, log_with_timestamp
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+from config import (
+    ARTIF_DIR, MODEL_DIR, FE_PATH, RERANKER_MODE, TOPK_RECALL_DEFAULT, TOPK_RETURN_DEFAULT, TORCH_NUM_THREADS,
+    FAISS_INDEX_TYPE, FAISS_HNSW_M, FAISS_EF_SEARCH, FAISS_NPROBE, FAISS_USE_GPU, log_with_timestamp
+)
+
+logger = logging.getLogger(__name__)
 
 # ===== ML MODEL LOADING =====
 vec = None
@@ -32,18 +46,34 @@ sbert_model = None
 sbert_ids = None
 sbert_embs = None
 faiss_index = None
+faiss_gpu_res = None  # kept alive for as long as the GPU index exists
 reranker = None
 
 # ===== ML FEATURE DATA =====
 fe = None
 
+# Click and order models score the same features; CatBoost releases the GIL while predicting
+_predict_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="catboost")
+
+def configure_torch_threads():
+    """Keep PyTorch intra/inter-op pools small so concurrent requests don't oversubscribe cores"""
+    torch.set_num_threads(TORCH_NUM_THREADS)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set once, before any inter-op parallel work has started
+        pass
+    log_with_timestamp(f"PyTorch threads: intra-op={torch.get_num_threads()}, inter-op={torch.get_num_interop_threads()}")
+
 def load_tfidf_models():
     """Load TF-IDF models"""
     global vec, X_corpus, id_list, id_to_idx
     try:
         vec = load(os.path.join(ARTIF_DIR, "tfidf_vec.joblib"))
-        X_corpus = load(os.path.join(ARTIF_DIR, "tfidf_X.joblib"))
-        id_list = load(os.path.join(ARTIF_DIR, "ids.joblib"))
+        # L2-normalize rows once so retrieval is a plain sparse dot product
+        X_corpus = normalize(load(os.path.join(ARTIF_DIR, "tfidf_X.joblib")).tocsr(), norm="l2", axis=1, copy=False)
+        # Object array so top-k ids are gathered with one fancy index
+        id_list = np.asarray(load(os.path.join(ARTIF_DIR, "ids.joblib")), dtype=object)
         id_to_idx = {cid: i for i, cid in enumerate(id_list)}
         log_with_timestamp(f"ML TF-IDF models loaded successfully (vocab: {len(vec.vocabulary_)}, corpus: {X_corpus.shape})")
     except Exception as e:
@@ -67,16 +97,158 @@ def load_order_model():
     except Exception as e:
         log_with_timestamp(f"ML Order model failed to load: {e}", "WARN")
 
+# Derived SBERT artifacts (fp16 copy, FAISS indexes) are rebuilt whenever
+# these source files change
+SBERT_SOURCE_FILES = ("sbert_emb.npy", "sbert_ids.joblib")
+
+def sbert_source_stamp():
+    """[mtime, size] of each SBERT source file, or None if any is missing"""
+    stamp = []
+    for name in SBERT_SOURCE_FILES:
+        path = os.path.join(ARTIF_DIR, name)
+        if not os.path.exists(path):
+            return None
+        st = os.stat(path)
+        stamp.append([st.st_mtime, st.st_size])
+    return stamp
+
+def is_fresh(path):
+    """path exists and was derived from the current SBERT source files"""
+    if not os.path.exists(path):
+        return False
+    stamp = sbert_source_stamp()
+    if stamp is None:
+        # Only the derived artifact was shipped; nothing to compare against
+        return True
+    try:
+        with open(path + ".stamp", encoding="utf-8") as f:
+            return json.load(f) == stamp
+    except (OSError, ValueError):
+        return False
+
+def write_stamp(path):
+    """Record the SBERT source stamp that path was derived from"""
+    tmp_path = f"{path}.stamp.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(sbert_source_stamp(), f)
+    os.replace(tmp_path, path + ".stamp")
+
+def load_sbert_embeddings(chunk_size=65536):
+    """Memory-map SBERT embeddings as float16, converting the fp32 artifact once"""
+    fp16_path = os.path.join(ARTIF_DIR, "sbert_emb_fp16.npy")
+    if not is_fresh(fp16_path):
+        log_with_timestamp("Converting SBERT embeddings to float16...")
+        src = np.load(os.path.join(ARTIF_DIR, "sbert_emb.npy"), mmap_mode="r")
+        # Per-process temp name: without preload_app every worker converts at once
+        tmp_path = f"{fp16_path}.{os.getpid()}.tmp"
+        dst = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float16, shape=src.shape)
+        for start in range(0, src.shape[0], chunk_size):
+            dst[start:start + chunk_size] = src[start:start + chunk_size]
+        dst.flush()
+        del dst
+        os.replace(tmp_path, fp16_path)
+        write_stamp(fp16_path)
+    return np.load(fp16_path, mmap_mode="r")
+
+def _training_sample(embs, size):
+    """Contiguous fp32 random subset of embs for index training"""
+    rng = np.random.default_rng(0)
+    rows = np.sort(rng.choice(embs.shape[0], size=min(embs.shape[0], size), replace=False))
+    return np.ascontiguousarray(embs[rows], dtype=np.float32)
+
+def new_faiss_index(embs, index_type):
+    """Empty (trained if needed) FAISS index of index_type for embs"""
+    d = embs.shape[1]
+    if index_type == "fp16":
+        return faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+    if index_type == "sq8":
+        # 1 byte per dimension; training only learns per-dimension ranges
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(_training_sample(embs, 100_000))
+        return index
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 200
+        return index
+    if index_type == "ivf":
+        nlist = max(1, int(np.sqrt(embs.shape[0])))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(d), d, nlist, faiss.METRIC_INNER_PRODUCT)
+        # k-means only needs a sample; FAISS itself caps training at 256 points per list
+        index.train(_training_sample(embs, nlist * 256))
+        return index
+    raise ValueError(f"Unknown FAISS_INDEX_TYPE: {index_type}")
+
+def resolve_faiss_index_type():
+    """FAISS_INDEX_TYPE, with "auto" preferring a prebuilt sq8 index over fp16"""
+    if FAISS_INDEX_TYPE != "auto":
+        return FAISS_INDEX_TYPE
+    if is_fresh(os.path.join(ARTIF_DIR, "sbert_faiss_sq8.index")):
+        return "sq8"
+    return "fp16"
+
+def load_faiss_index(embs, index_type, chunk_size=65536):
+    """Load the FAISS index of index_type, building and caching it on first use"""
+    if index_type == "flat":
+        return faiss.read_index(os.path.join(ARTIF_DIR, "sbert_faiss.index"))
+
+    index_path = os.path.join(ARTIF_DIR, f"sbert_faiss_{index_type}.index")
+    if is_fresh(index_path):
+        index = faiss.read_index(index_path)
+    else:
+        log_with_timestamp(f"Building {index_type} FAISS index...")
+        index = new_faiss_index(embs, index_type)
+        for start in range(0, embs.shape[0], chunk_size):
+            # FAISS takes fp32 input; quantized storage converts internally
+            index.add(np.ascontiguousarray(embs[start:start + chunk_size], dtype=np.float32))
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        faiss.write_index(index, tmp_path)
+        os.replace(tmp_path, index_path)
+        write_stamp(index_path)
+
+    # Search-time parameters are not stored in the index file
+    if index_type == "hnsw":
+        index.hnsw.efSearch = FAISS_EF_SEARCH
+    elif index_type == "ivf":
+        index.nprobe = FAISS_NPROBE
+    return index
+
+def to_gpu_index(index):
+    """Move index to GPU 0 when FAISS_USE_GPU is set and a GPU is available"""
+    global faiss_gpu_res
+    if not FAISS_USE_GPU:
+        return index
+    if not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() == 0:
+        log_with_timestamp("FAISS_USE_GPU set but no GPU FAISS build/device found, using CPU index", "WARN")
+        return index
+    try:
+        if faiss_gpu_res is None:
+            faiss_gpu_res = faiss.StandardGpuResources()
+        index = faiss.index_cpu_to_gpu(faiss_gpu_res, 0, index)
+        log_with_timestamp("FAISS index moved to GPU 0")
+    except RuntimeError as e:
+        # e.g. HNSW has no GPU implementation
+        log_with_timestamp(f"FAISS index could not be moved to GPU: {e}", "WARN")
+    return index
+
+def log_faiss_build():
+    """Log which SIMD kernels the FAISS build uses so a generic build is noticed"""
+    options = faiss.get_compile_options()
+    log_with_timestamp(f"FAISS {faiss.__version__} compile options: {options}")
+    if platform.machine().lower() in ("x86_64", "amd64") and "AVX2" not in options and "AVX512" not in options:
+        log_with_timestamp("FAISS is running without AVX2 kernels; distance scans will be slower", "WARN")
+
 def load_sbert_models():
     """Load SBERT models for semantic search"""
     global sbert_model, sbert_ids, sbert_embs, faiss_index
     try:
         log_with_timestamp("Loading SBERT model...")
         sbert_model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-mpnet-base-v2")
-        sbert_ids = load(os.path.join(ARTIF_DIR, "sbert_ids.joblib"))
-        sbert_embs = np.load(os.path.join(ARTIF_DIR, "sbert_emb.npy"))
-        faiss_index = faiss.read_index(os.path.join(ARTIF_DIR, "sbert_faiss.index"))
-        log_with_timestamp(f"SBERT models loaded successfully (embeddings: {sbert_embs.shape}, index size: {faiss_index.ntotal})")
+        sbert_ids = np.asarray(load(os.path.join(ARTIF_DIR, "sbert_ids.joblib")), dtype=object)
+        log_faiss_build()
+        sbert_embs = load_sbert_embeddings()
+        index_type = resolve_faiss_index_type()
+        faiss_index = to_gpu_index(load_faiss_index(sbert_embs, index_type))
+        log_with_timestamp(f"SBERT models loaded successfully (embeddings: {sbert_embs.shape} {sbert_embs.dtype}, index: {index_type}, size: {faiss_index.ntotal})")
     except Exception as e:
         log_with_timestamp(f"SBERT models failed to load: {e}", "WARN")
         sbert_model = None
@@ -108,12 +280,13 @@ def load_feature_data():
     global fe
     try:
         log_with_timestamp("Loading ML feature data...")
-        fe = pl.read_parquet(FE_PATH).select([
+        # Projection pushdown: only these columns are decoded from the parquet file
+        fe = pl.scan_parquet(FE_PATH).select([
             "content_id_hashed","content_title","image_url",
             "selling_price","content_rate_avg","content_review_count",
             "level1_category_name","level2_category_name","leaf_category_name",
             "original_price","discounted_price","merchant_count","content_rate_count"
-        ])
+        ]).collect()
         log_with_timestamp(f"ML Feature data loaded successfully: {len(fe)} products with all fields")
     except Exception as e:
         log_with_timestamp(f"ML Feature data failed to load: {e}", "ERROR")
@@ -121,41 +294,79 @@ def load_feature_data():
 
 def load_all_models():
     """Load all AI models and data"""
-    load_tfidf_models()
-    load_click_model()
-    load_order_model()
-    load_sbert_models()
-    load_reranker()
-    load_feature_data()
+    # Loaders are I/O bound and each sets its own globals, so they can overlap
+    loaders = [load_sbert_models, load_reranker, load_tfidf_models,
+               load_click_model, load_order_model, load_feature_data]
+    with ThreadPoolExecutor(max_workers=len(loaders), thread_name_prefix="load") as ex:
+        for future in [ex.submit(loader) for loader in loaders]:
+            future.result()
 
 # ===== ML HELPER FUNCTIONS =====
+# Anything outside the kept character set is a word break; this already
+# covers the _ / - \ separators
+_NON_WORD_RE = re.compile(r"[^0-9a-zçğıöşü\s]+")
+
 def norm_query(s: str) -> str:
     """Normalize query text for TF-IDF search"""
     if not isinstance(s, str):
         return ""
-    s = unicodedata.normalize("NFKD", s.lower().strip())
-    s = re.sub(r"[_/\-\\]", " ", s)
-    s = re.sub(r"[^0-9a-zçğıöşü\s]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    s = unicodedata.normalize("NFKD", s.lower())
+    return " ".join(_NON_WORD_RE.sub(" ", s).split())
 
 def norm_text(s: str) -> str:
     """Normalize text for SBERT"""
     if not isinstance(s, str):
         return ""
-    s = unicodedata.normalize("NFKD", s.lower().strip())
-    s = re.sub(r"[_\-/]", " ", s)
-    s = re.sub(r"[^0-9a-zçğıöşü\s]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    s = unicodedata.normalize("NFKD", s.lower())
+    return " ".join(_NON_WORD_RE.sub(" ", s).split())
+
+# Below this size NumPy's per-call overhead dominates minmax, so the
+# single-loop numba kernel is used instead when numba is installed
+MINMAX_NUMBA_MAX_SIZE = 4096
+
+if njit is not None:
+    @njit("float32[:](float32[:])", cache=True, fastmath=True)
+    def _minmax_nb(a):
+        mn = a[0]
+        mx = a[0]
+        for i in range(1, a.size):
+            if a[i] < mn:
+                mn = a[i]
+            elif a[i] > mx:
+                mx = a[i]
+        out = np.zeros_like(a)
+        if mx > mn:
+            rng = mx - mn + np.float32(1e-12)
+            for i in range(a.size):
+                out[i] = (a[i] - mn) / rng
+        return out
+else:
+    _minmax_nb = None
 
 def minmax(a):
     """Min-max normalization"""
     a = np.asarray(a, dtype=np.float32)
     if a.size == 0:
         return a
-    mn, mx = float(np.min(a)), float(np.max(a))
-    return (a - mn) / (mx - mn + 1e-12) if mx > mn else np.zeros_like(a, dtype=np.float32)
+    if _minmax_nb is not None and a.ndim == 1 and a.size < MINMAX_NUMBA_MAX_SIZE:
+        return _minmax_nb(a)
+    mn = a.min()
+    rng = np.ptp(a)
+    if rng <= 0:
+        return np.zeros_like(a, dtype=np.float32)
+    # New array from the subtraction, then divide in place
+    out = a - mn
+    out /= rng + 1e-12
+    return out
+
+def top_k_indices(scores, k):
+    """Indices of the k largest scores, best first (O(N) partition + O(k log k) sort)"""
+    scores = np.asarray(scores)
+    k = min(k, scores.size)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
 
 def tfidf_score(query: str, cid: str) -> float:
     """Calculate TF-IDF cosine similarity for a single product"""
@@ -164,9 +375,9 @@ def tfidf_score(query: str, cid: str) -> float:
     q = norm_query(query)
     if not q:
         return 0.0
-    qv = vec.transform([q])
+    qv = normalize(vec.transform([q]), copy=False)
     cv = X_corpus[id_to_idx[cid]]
-    return float(cosine_similarity(qv, cv)[0][0])
+    return float((cv @ qv.T).toarray()[0, 0])
 
 def retrieve_ids(query: str, topk: int = 200):
     """Retrieve product IDs using TF-IDF similarity"""
@@ -175,12 +386,24 @@ def retrieve_ids(query: str, topk: int = 200):
     q = norm_query(query)
     if not q:
         return [], []
-    qv = vec.transform([q])
-    sims = cosine_similarity(qv, X_corpus)[0]
-    order = np.argsort(sims)[::-1][:topk]
-    return [id_list[i] for i in order], sims[order]
+    qv = normalize(vec.transform([q]), copy=False)
+    sims = (X_corpus @ qv.T).toarray().ravel()
+    order = top_k_indices(sims, topk)
+    return id_list[order].tolist(), sims[order]
+
+def predict_click_order(Xq):
+    """Click and order model scores for a feature matrix"""
+    click_future = _predict_executor.submit(m_click.predict, Xq)
+    s_order = m_order.predict(Xq)
+    return click_future.result(), s_order
+
+def predict_click_order_batch(Xqs):
+    """predict_click_order over several requests' features in one model call each"""
+    s_click, s_order = predict_click_order(np.concatenate(Xqs))
+    splits = np.cumsum([len(Xq) for Xq in Xqs])[:-1]
+    return list(zip(np.split(s_click, splits), np.split(s_order, splits)))
 
-def ml_search(query: str, topk_retrieval=200, topk_final=50):
+def ml_search(query: str, topk_retrieval=200, topk_final=50, predict=predict_click_order):
     """Perform ML-based search using TF-IDF + CatBoost"""
     if vec is None or X_corpus is None or m_click is None or m_order is None or fe is None:
         log_with_timestamp("ML models not available for search", "WARN")
@@ -190,26 +413,22 @@ def ml_search(query: str, topk_retrieval=200, topk_final=50):
             "score": [], "tfidf_sim": []
         })
 
-    log_with_timestamp(f"ML Step 1: TF-IDF retrieval (top {topk_retrieval})")
+    logger.debug(f"ML Step 1: TF-IDF retrieval (top {topk_retrieval})")
     ids_ret, sims = retrieve_ids(query, topk_retrieval)
     if not ids_ret:
-        log_with_timestamp("No products found in TF-IDF retrieval")
+        logger.debug("No products found in TF-IDF retrieval")
         return pl.DataFrame({
             "content_id_hashed": [], "content_title": [], "image_url": [],
             "selling_price": [], "content_rate_avg": [], "content_review_count": [],
             "score": [], "tfidf_sim": []
         })
 
-    log_with_timestamp(f"ML Step 1 Complete: {len(ids_ret)} products retrieved")
+    logger.debug(f"ML Step 1 Complete: {len(ids_ret)} products retrieved")
 
-    log_with_timestamp("ML Step 2: Computing TF-IDF similarities...")
-    df = pl.DataFrame({"content_id_hashed": ids_ret}).with_columns(
-        pl.col("content_id_hashed")
-          .map_elements(lambda cid: tfidf_score(query, cid))
-          .alias("tfidf_sim")
-    )
+    # Retrieval already computed the similarities for the top-k ids
+    df = pl.DataFrame({"content_id_hashed": ids_ret, "tfidf_sim": sims.astype(np.float32)})
 
-    log_with_timestamp("ML Step 3: Joining with product features...")
+    logger.debug("ML Step 3: Joining with product features...")
     df = df.join(fe, on="content_id_hashed", how="left").with_columns([
         pl.col("selling_price").fill_null(0.0),
         pl.col("original_price").fill_null(0.0),
@@ -225,50 +444,62 @@ def ml_search(query: str, topk_retrieval=200, topk_final=50):
         pl.col("image_url").fill_null("")
     ])
 
-    log_with_timestamp("ML Step 4: Running CatBoost predictions...")
-    Xq = df.select(["tfidf_sim"]).to_pandas().values
-    s_click = m_click.predict(Xq)
-    s_order = m_order.predict(Xq)
+    logger.debug("ML Step 4: Running CatBoost predictions...")
+    Xq = df.get_column("tfidf_sim").to_numpy().reshape(-1, 1).astype(np.float32, copy=False)
+    s_click, s_order = predict(Xq)
 
-    log_with_timestamp(f"Click predictions: min={s_click.min():.4f}, max={s_click.max():.4f}")
-    log_with_timestamp(f"Order predictions: min={s_order.min():.4f}, max={s_order.max():.4f}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Click predictions: min={s_click.min():.4f}, max={s_click.max():.4f}")
+        logger.debug(f"Order predictions: min={s_order.min():.4f}, max={s_order.max():.4f}")
 
     final = 0.3 * minmax(s_click) + 0.7 * minmax(s_order)
-    log_with_timestamp(f"Final combined score: min={final.min():.4f}, max={final.max():.4f}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Final combined score: min={final.min():.4f}, max={final.max():.4f}")
 
-    order_idx = np.argsort(-final)[:topk_final]
+    order_idx = top_k_indices(final, topk_final)
     order_idx = order_idx.astype(int)
 
-    log_with_timestamp(f"ML Step 4 Complete: Top {topk_final} products selected")
+    logger.debug(f"ML Step 4 Complete: Top {topk_final} products selected")
 
-    scores_df = pl.DataFrame({
-        "_row": order_idx,
-        "score": final[order_idx].astype(np.float32)
-    })
+    # Selected rows keep their retrieval order
+    rows = np.sort(order_idx)
+    out = df[rows].with_columns(pl.Series("score", final[rows].astype(np.float32)))
 
-    out = (
-        df
-        .with_row_index("_row")
-        .join(scores_df, on="_row", how="inner")
-        .sort("_row")
-        .drop("_row")
-    )
+    return out
 
+def encode_queries(queries):
+    """Normalized SBERT embeddings for a batch of queries (None where unavailable)"""
+    if sbert_model is None:
+        return [None] * len(queries)
+    texts = [norm_text(q) for q in queries]
+    present = [i for i, t in enumerate(texts) if t]
+    out = [None] * len(queries)
+    if present:
+        embs = sbert_model.encode([texts[i] for i in present], batch_size=32,
+                                  normalize_embeddings=True, convert_to_numpy=True).astype("float32")
+        for i, emb in zip(present, embs):
+            out[i] = emb
     return out
 
-def sbert_recall(query: str, topk: int):
+def encode_query(query: str):
+    """Normalized SBERT embedding of a query, or None if unavailable"""
+    return encode_queries([query])[0]
+
+def sbert_recall(query: str, topk: int, qv=None):
     """Perform SBERT + FAISS semantic retrieval"""
     if sbert_model is None or faiss_index is None or sbert_ids is None:
         return [], []
 
-    q = norm_text(query)
-    if not q:
+    if qv is None:
+        qv = encode_query(query)
+    if qv is None:
         return [], []
 
-    qv = sbert_model.encode([q], normalize_embeddings=True).astype("float32")
-    sims, idxs = faiss_index.search(qv, topk)
-    ids = [sbert_ids[i] for i in idxs[0]]
-    scores = sims[0]
+    sims, idxs = faiss_index.search(qv.reshape(1, -1), topk)
+    # Approximate indexes pad with -1 when fewer than topk neighbours are found
+    found = idxs[0] >= 0
+    ids = sbert_ids[idxs[0][found]].tolist()
+    scores = sims[0][found]
     return ids, scores
 
 def texts_for_reranker(ids):
@@ -296,7 +527,23 @@ def build_doc_text(title: str, level2_category: str, leaf_category: str) -> str:
         parts.append(leaf_category)
     return " ".join(parts) if parts else "Ürün"
 
-def hybrid_semantic_search(query: str, recall_k: int = TOPK_RECALL_DEFAULT, return_k: int = TOPK_RETURN_DEFAULT):
+def doc_text_expr() -> pl.Expr:
+    """build_doc_text over the title/category columns as one Polars expression.
+
+    Must stay row-for-row identical to build_doc_text above (null/"" handling,
+    "Ürün" placeholder, title-level2-leaf order, single-space separator).
+    """
+    title = pl.col("content_title")
+    level2 = pl.col("level2_category_name")
+    leaf = pl.col("leaf_category_name")
+    text = pl.concat_str([
+        pl.when((title != "") & (title != "Ürün")).then(title),
+        pl.when(level2 != "").then(level2),
+        pl.when((leaf != "") & leaf.ne_missing(level2)).then(leaf),
+    ], separator=" ", ignore_nulls=True)
+    return pl.when(text != "").then(text).otherwise(pl.lit("Ürün")).alias("doc_text")
+
+def hybrid_semantic_search(query: str, recall_k: int = TOPK_RECALL_DEFAULT, return_k: int = TOPK_RETURN_DEFAULT, qv=None):
     """Perform enhanced hybrid semantic search with SBERT + Advanced Reranker"""
     if (sbert_model is None or faiss_index is None or
         sbert_ids is None or fe is None):
@@ -307,65 +554,51 @@ def hybrid_semantic_search(query: str, recall_k: int = TOPK_RECALL_DEFAULT, retu
             "score": []
         })
 
-    log_with_timestamp(f"Semantic Step 1: SBERT recall (top {recall_k})")
-    ids, sbert_scores = sbert_recall(query, recall_k)
+    logger.debug(f"Semantic Step 1: SBERT recall (top {recall_k})")
+    ids, sbert_scores = sbert_recall(query, recall_k, qv)
     if not ids:
-        log_with_timestamp("No products found in SBERT recall")
+        logger.debug("No products found in SBERT recall")
         return pl.DataFrame({
             "content_id_hashed": [], "content_title": [], "image_url": [],
             "selling_price": [], "content_rate_avg": [], "content_review_count": [],
             "score": []
         })
 
-    log_with_timestamp(f"Semantic Step 1 Complete: {len(ids)} products retrieved")
+    logger.debug(f"Semantic Step 1 Complete: {len(ids)} products retrieved")
 
     # Join with product features first
     df = pl.DataFrame({"content_id_hashed": ids}).join(fe, on="content_id_hashed", how="left")
 
-    log_with_timestamp("Semantic Step 2: Advanced reranking with rich document context...")
+    logger.debug("Semantic Step 2: Advanced reranking with rich document context...")
 
     # Build rich document texts
-    doc_texts = []
-    for row in df.to_dicts():
-        doc_text = build_doc_text(
-            row.get("content_title", ""),
-            row.get("level2_category_name", ""),
-            row.get("leaf_category_name", "")
-        )
-        doc_texts.append(doc_text)
+    doc_texts = df.select(doc_text_expr()).to_series().to_list()
 
     # Rerank with rich context
     reranker_scores = reranker.score(query, doc_texts, batch_size=64)
 
-    log_with_timestamp(f"Reranker scores: min={np.min(reranker_scores):.4f}, max={np.max(reranker_scores):.4f}")
-    log_with_timestamp(f"SBERT scores: min={np.min(sbert_scores):.4f}, max={np.max(sbert_scores):.4f}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Reranker scores: min={np.min(reranker_scores):.4f}, max={np.max(reranker_scores):.4f}")
+        logger.debug(f"SBERT scores: min={np.min(sbert_scores):.4f}, max={np.max(sbert_scores):.4f}")
 
     # Advanced hybrid scoring with reranker priority
     if reranker is not None:
         # Reranker-first approach
-        order_idx = np.argsort(-reranker_scores)[:return_k].astype(np.int64)
+        order_idx = top_k_indices(reranker_scores, return_k)
         final_scores = reranker_scores[order_idx]
 
-        log_with_timestamp("Using reranker-first scoring approach")
+        logger.debug("Using reranker-first scoring approach")
     else:
         # Fallback to SBERT only
-        order_idx = np.argsort(-sbert_scores)[:return_k].astype(np.int64)
+        order_idx = top_k_indices(sbert_scores, return_k)
         final_scores = sbert_scores[order_idx]
 
-    log_with_timestamp(f"Semantic Step 2 Complete: Top {return_k} products selected")
-
-    # Create result dataframe with proper ordering
-    rank_df = pl.DataFrame({
-        "__row": order_idx,
-        "__rank": np.arange(len(order_idx), dtype=np.int64),
-        "score": final_scores.astype(np.float32)
-    })
+    logger.debug(f"Semantic Step 2 Complete: Top {return_k} products selected")
 
+    # Create result dataframe in score order with a positional gather
     out = (
-        df.with_row_index("__row")
-          .join(rank_df, on="__row", how="inner")
-          .sort("__rank")
-          .drop(["__row", "__rank"])
+        df[order_idx]
+          .with_columns(pl.Series("score", final_scores.astype(np.float32)))
           .with_columns([
               pl.col("selling_price").fill_null(0.0),
               pl.col("content_rate_avg").fill_null(0.0),
@@ -0,0 +1,89 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from config import log_with_timestamp
+
+# ===== REQUEST COALESCING =====
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into one batched model call.
+
+    fn takes a list of items and returns a list of results in the same order.
+    It runs on a dedicated thread so batches are serialized and never compete
+    with the request handlers' executor.
+    """
+
+    def __init__(self, fn, name: str, max_size: int = 32, max_wait: float = 0.005):
+        self.fn = fn
+        self.name = name
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"batch-{name}")
+        self._queue = None
+        self._loop = None
+        self._task = None
+
+    def start(self):
+        """Start the drain task on the running event loop"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+
+    async def submit(self, item):
+        """Queue item and wait for its result"""
+        if self._task is None:
+            return self.fn([item])[0]
+        future = self._loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def submit_threadsafe(self, item):
+        """Blocking submit for code running in worker threads"""
+        if self._task is None:
+            return self.fn([item])[0]
+        return asyncio.run_coroutine_threadsafe(self.submit(item), self._loop).result()
+
+    async def _collect(self):
+        """Wait for one item, then take whatever else arrives within max_wait"""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await self._loop.run_in_executor(self._executor, self.fn, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            if len(batch) > 1:
+                log_with_timestamp(f"{self.name} batch: {len(batch)} requests")
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
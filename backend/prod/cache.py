@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from cachetools import TTLCache
+from config import (
+    AUTOCOMPLETE_CACHE_SIZE, AUTOCOMPLETE_CACHE_TTL, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL,
+    SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD
+)
+
+# ===== AUTOCOMPLETE CACHE =====
+# Typeahead keeps hitting the same short prefixes, so suggestions are kept
+# per normalized query until the TTL expires or data is refreshed.
+autocomplete_cache = TTLCache(maxsize=AUTOCOMPLETE_CACHE_SIZE, ttl=AUTOCOMPLETE_CACHE_TTL)
+
+def autocomplete_key(query: str) -> str:
+    """Build cache key for an autocomplete query"""
+    return query.strip().lower()
+
+# ===== SEARCH CACHE =====
+# Exact repeats of a search are served before the semantic cache is consulted.
+# Values are serialized product dicts so a hit skips model construction.
+search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+def search_key(query: str, mode: str, limit: int):
+    """Build cache key for a search request"""
+    return (query.strip().lower(), mode, limit)
+
+# Head-of-distribution queries precomputed at startup; never expires
+warm_search_cache = {}
+
+# ===== SEMANTIC SEARCH CACHE =====
+class SemanticCache:
+    """LRU cache of search results keyed by normalized query embedding"""
+
+    def __init__(self, maxsize: int, threshold: float):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._vectors = None  # (maxsize, dim) slot matrix, allocated on first put
+        self._tags = np.full(maxsize, -1, dtype=np.int32)
+        self._tag_ids = {}
+        self._entries = OrderedDict()  # slot -> value, oldest first
+
+    def get(self, qv: np.ndarray, key):
+        """Cached value for the closest stored query with the same key, if similar enough"""
+        with self._lock:
+            tag = self._tag_ids.get(key)
+            if tag is None or self._vectors is None:
+                return None
+            sims = self._vectors @ qv
+            sims[self._tags != tag] = -np.inf
+            slot = int(np.argmax(sims))
+            if sims[slot] < self.threshold:
+                return None
+            self._entries.move_to_end(slot)
+            return self._entries[slot]
+
+    def put(self, qv: np.ndarray, key, value):
+        """Store value for (qv, key), evicting the least recently used slot when full"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, qv.shape[0]), dtype=np.float32)
+            if len(self._entries) < self.maxsize:
+                slot = len(self._entries)
+            else:
+                slot, _ = self._entries.popitem(last=False)
+            self._vectors[slot] = qv
+            self._tags[slot] = self._tag_ids.setdefault(key, len(self._tag_ids))
+            self._entries[slot] = value
+
+    def clear(self):
+        with self._lock:
+            self._vectors = None
+            self._tags.fill(-1)
+            self._tag_ids.clear()
+            self._entries.clear()
+
+semantic_cache = SemanticCache(SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD)
+
+def clear_caches():
+    """Drop all cached responses (called after data refresh)"""
+    autocomplete_cache.clear()
+    search_cache.clear()
+    warm_search_cache.clear()
+    semantic_cache.clear()
@@ -15,15 +15,52 @@ FE_PATH = os.path.expanduser("~/trendyol-teknofest-hackathon/hackathon_2nd_phase
 print(f"DEBUG: FE_PATH = {FE_PATH}")
 print(f"DEBUG: File exists = {os.path.exists(FE_PATH)}")
 
+# ===== SERVER =====
+# gunicorn_conf.py sets this so models load in the master before workers fork
+PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS", "0") == "1"
+
 # ===== HYBRID SEMANTIC SEARCH MODELS =====
 RERANKER_MODE = os.environ.get("RERANKER_MODE", "crossencoder").lower()
 TOPK_RECALL_DEFAULT = 400
 TOPK_RETURN_DEFAULT = 50
+# "fp16" keeps SBERT vectors as float16 (half the RAM / scan bandwidth), "sq8" as int8 (a quarter),
+# "flat" uses the fp32 IndexFlatIP, "hnsw" / "ivf" trade a little recall for sublinear search.
+# "auto" uses a prebuilt sbert_faiss_sq8.index when present, else fp16.
+FAISS_INDEX_TYPE = os.environ.get("FAISS_INDEX_TYPE", "auto").lower()
+FAISS_HNSW_M = int(os.environ.get("FAISS_HNSW_M", "32"))
+FAISS_EF_SEARCH = int(os.environ.get("FAISS_EF_SEARCH", "64"))
+FAISS_NPROBE = int(os.environ.get("FAISS_NPROBE", "16"))
+FAISS_USE_GPU = os.environ.get("FAISS_USE_GPU", "0") == "1"
+
+# ===== INFERENCE THREADING =====
+RERANK_WORKERS = int(os.environ.get("RERANK_WORKERS", max(1, min(4, (os.cpu_count() or 2) // 2))))
+TORCH_NUM_THREADS = int(os.environ.get("TORCH_NUM_THREADS", "1"))
+# Concurrent SBERT encodes / CatBoost predicts are coalesced into batches
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "5"))
 
 # ===== ELASTICSEARCH SETUP =====
 ELASTICSEARCH_URL = "http://localhost:9200"
 PRODUCTS_INDEX = "trendyol_products"
 
+# ===== RESPONSE CACHES =====
+AUTOCOMPLETE_CACHE_SIZE = int(os.environ.get("AUTOCOMPLETE_CACHE_SIZE", "32768"))
+AUTOCOMPLETE_CACHE_TTL = int(os.environ.get("AUTOCOMPLETE_CACHE_TTL", "300"))
+# Exact-match cache for /search responses
+SEARCH_CACHE_ENABLED = os.environ.get("SEARCH_CACHE_ENABLED", "1") == "1"
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", "8192"))
+SEARCH_CACHE_TTL = int(os.environ.get("SEARCH_CACHE_TTL", "300"))
+# Startup warm-up: top logged queries (one per line, most frequent first) are
+# precomputed into a non-expiring cache, persisted to WARM_CACHE_PATH
+WARM_QUERIES_PATH = os.environ.get("WARM_QUERIES_PATH", "")
+WARM_QUERIES_TOP_K = int(os.environ.get("WARM_QUERIES_TOP_K", "1000"))
+WARM_QUERIES_MODES = [m for m in os.environ.get("WARM_QUERIES_MODES", "ml,hybrid").split(",") if m]
+WARM_QUERIES_LIMITS = [int(n) for n in os.environ.get("WARM_QUERIES_LIMITS", "50").split(",") if n]
+WARM_CACHE_PATH = os.path.join(ARTIF_DIR, "warm_search_cache.joblib")
+# Semantic cache for ml/hybrid searches; size 0 disables it
+SEMANTIC_CACHE_SIZE = int(os.environ.get("SEMANTIC_CACHE_SIZE", "2048"))
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+
 def log_with_timestamp(message, level="INFO"):
     """Log messages with timestamp"""
     timestamp = datetime.now().strftime("%H:%M:%S")
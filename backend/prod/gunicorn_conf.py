@@ -0,0 +1,21 @@
+"""
+Gunicorn configuration for production.
+
+Run from backend/prod:
+    gunicorn -c gunicorn_conf.py main:app
+"""
+import multiprocessing
+import os
+
+# Load data and models once in the master; workers inherit them via fork
+os.environ.setdefault("PRELOAD_MODELS", "1")
+preload_app = True
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Model loading in the master can take minutes on a cold cache
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+keepalive = 5
@@ -1,24 +1,42 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-import traceback
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, TypeAdapter
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
+import os
+import time
+import uuid
+import orjson
+import polars as pl
 from typing import List, Dict, Optional
 from datetime import datetime
 
-from config import log_with_timestamp
+from joblib import load, dump
+from config import (
+    FE_PATH, PRELOAD_MODELS, RERANK_WORKERS, SEARCH_CACHE_ENABLED, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS,
+    WARM_QUERIES_PATH, WARM_QUERIES_TOP_K, WARM_QUERIES_MODES, WARM_QUERIES_LIMITS, WARM_CACHE_PATH,
+    log_with_timestamp
+)
 import ai_model
+import elastic_search
 from ai_model import (
-    load_all_models, ml_search, hybrid_semantic_search,
+    load_all_models, configure_torch_threads, ml_search, hybrid_semantic_search,
     RERANKER_MODE, TOPK_RECALL_DEFAULT, TOPK_RETURN_DEFAULT
 )
 from service import (
-    load_data, db_search, advanced_db_search, get_categories,
+    load_data, db_search_frame, advanced_db_search_frame, get_categories,
     get_grouped_categories, get_popular_categories,
     get_fallback_autocomplete_suggestions, get_database
 )
 from elastic_search import init_elasticsearch, get_autocomplete_suggestions, index_product_data
+from batching import MicroBatcher
+from cache import (
+    autocomplete_cache, autocomplete_key, search_cache, search_key,
+    warm_search_cache, semantic_cache, clear_caches
+)
 
 # Logging setup
 logging.basicConfig(level=logging.INFO)
@@ -35,10 +53,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Bounded pool for SBERT/reranker inference. Concurrency comes from these
+# threads while each PyTorch call stays single-threaded (no oversubscription).
+RERANK_EXECUTOR = ThreadPoolExecutor(max_workers=RERANK_WORKERS, thread_name_prefix="rerank")
+# DB searches run here instead of on the event loop; Polars releases the GIL
+THREADPOOL = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="search")
+
+# Coalesce concurrent queries into one SBERT encode / one CatBoost predict
+encode_batcher = MicroBatcher(ai_model.encode_queries, "sbert", BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS / 1000)
+predict_batcher = MicroBatcher(ai_model.predict_click_order_batch, "catboost", BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS / 1000)
+
+# Request id for correlating error responses with server logs
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+@app.middleware("http")
+async def add_request_id(request: Request, call_next):
+    """Attach an X-Request-ID to every request and response"""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+def error_response(message: str, e: Exception) -> JSONResponse:
+    """Log the full traceback server-side and return a compact 500 body"""
+    request_id = request_id_var.get()
+    logger.exception(f"{message} (request_id={request_id})")
+    return JSONResponse(
+        status_code=500,
+        content={"error": str(e), "request_id": request_id}
+    )
+
+def require_database():
+    """Dependency: loaded product frame, or 503 until data is available"""
+    df = get_database()
+    if df is None:
+        raise HTTPException(status_code=503, detail="Data not loaded")
+    return df
+
 # ===== PYDANTIC MODELS =====
+# limit is part of every cache key, so it is bounded like GET /search topk
 class SearchRequest(BaseModel):
     query: str
-    limit: Optional[int] = 50
+    limit: int = Field(50, ge=1, le=200)
     mode: Optional[str] = "db"  # "ml", "db", or "hybrid"
 
 class ProductResponse(BaseModel):
@@ -76,44 +136,108 @@ class AdvancedSearchRequest(BaseModel):
     max_price: Optional[float] = None
     min_rating: Optional[float] = None
     min_review_count: Optional[int] = None
-    limit: int = 50
+    limit: int = Field(50, ge=1, le=200)
     mode: Optional[str] = "db"  # "ml", "db", or "hybrid"
 
 class AutocompleteResponse(BaseModel):
     suggestions: List[Dict[str, str]]
     total: int
 
-def format_product_response(product: Dict, mode: str) -> ProductResponse:
-    """Format product data to ProductResponse"""
-    title = product.get('content_title', 'Ürün')
-    if title == 'Lorem Ipsum':
-        title = f"{product.get('level2_category_name', 'Ürün')} - {product.get('leaf_category_name', 'Detay')}"
-
-    # Calculate discount percentage
-    original = product.get('original_price', 0)
-    selling = product.get('selling_price', 0)
-    discount_pct = None
-    if original and selling and original > selling and original > 0:
-        discount_pct = round(((original - selling) / original) * 100, 1)
-
-    return ProductResponse(
-        content_id_hashed=product.get('content_id_hashed', ''),
-        content_title=title,
-        image_url=product.get('image_url', ''),
-        level1_category_name=product.get('level1_category_name', ''),
-        level2_category_name=product.get('level2_category_name', ''),
-        leaf_category_name=product.get('leaf_category_name', ''),
-        merchant_count=product.get('merchant_count'),
-        original_price=product.get('original_price', 0.0),
-        selling_price=product.get('selling_price', 0.0),
-        discounted_price=product.get('discounted_price', 0.0),
-        content_review_count=int(product.get('content_review_count', 0)),
-        content_rate_count=int(product.get('content_rate_count', 0)),
-        content_rate_avg=product.get('content_rate_avg'),
-        discount_percentage=discount_pct,
-        tfidf_sim=product.get('tfidf_sim'),
-        score=product.get('score')
-    )
+# Search responses are streamed, so response_model no longer checks the
+# products; they are validated here in one call over the whole list
+_PRODUCT_LIST = TypeAdapter(List[ProductResponse])
+
+def format_products(res_df: pl.DataFrame) -> List[ProductResponse]:
+    """Format a result frame to ProductResponse list, deriving title/discount in Polars"""
+    if res_df.height == 0:
+        return []
+
+    title = pl.col("content_title")
+    original = pl.col("original_price")
+    selling = pl.col("selling_price")
+    derived = {
+        # Required fields: fill nulls so one incomplete row doesn't fail the response
+        "content_id_hashed": pl.col("content_id_hashed").cast(pl.Utf8).fill_null(""),
+        "image_url": pl.col("image_url").fill_null(""),
+        "selling_price": selling.cast(pl.Float64).fill_null(0.0),
+        "content_title": pl.when(title.is_null() | (title == "Lorem Ipsum"))
+            .then(pl.concat_str([
+                pl.col("level2_category_name").fill_null("Ürün"),
+                pl.lit(" - "),
+                pl.col("leaf_category_name").fill_null("Detay"),
+            ]))
+            .otherwise(title),
+        "content_review_count": pl.col("content_review_count").fill_null(0).cast(pl.Int64),
+        "content_rate_count": pl.col("content_rate_count").fill_null(0).cast(pl.Int64),
+        "discount_percentage": pl.when((original > 0) & (selling != 0) & (original > selling))
+            .then(((original - selling) / original * 100).round(1)),
+    }
+    columns = set(res_df.columns)
+    exprs = []
+    for name in ProductResponse.model_fields:
+        if name in derived and (name == "discount_percentage" or name in columns):
+            exprs.append(derived[name].alias(name))
+        elif name in columns:
+            exprs.append(pl.col(name))
+        else:
+            exprs.append(pl.lit(None).alias(name))
+
+    return _PRODUCT_LIST.validate_python(list(res_df.select(exprs).iter_rows(named=True)))
+
+def log_column_means(res_df: pl.DataFrame, columns: Dict[str, str]):
+    """DEBUG-log the means of result columns ({column: label}) in one Polars pass"""
+    if res_df.height == 0 or not logger.isEnabledFor(logging.DEBUG):
+        return
+    present = [c for c in columns if c in res_df.columns]
+    stats = res_df.select(pl.col(present).cast(pl.Float64).fill_null(0.0).mean()).row(0, named=True)
+    logger.debug(", ".join(f"{columns[c]}: {v:.4f}" for c, v in stats.items()))
+
+# ===== DATA & MODEL LOADING =====
+_application_data_loaded = False
+
+def load_application_data():
+    """Load database and AI models once per process"""
+    global _application_data_loaded
+    if _application_data_loaded:
+        return
+
+    log_with_timestamp("Loading application data...")
+
+    # Limit PyTorch thread pools before any model is loaded
+    configure_torch_threads()
+
+    # Load database and AI models concurrently
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="load") as ex:
+        futures = [ex.submit(load_data), ex.submit(load_all_models)]
+        for future in futures:
+            future.result()
+
+    _application_data_loaded = True
+
+# Under gunicorn (preload_app=True) the app module is imported by the master,
+# so loading here lets forked workers share model memory copy-on-write.
+if PRELOAD_MODELS:
+    load_application_data()
+
+_startup_jobs_done = False
+
+def run_startup_jobs():
+    """One-off startup work shared by all workers, run once per process tree"""
+    global _startup_jobs_done
+    if _startup_jobs_done:
+        return
+
+    # Runs the handlers synchronously, so it must finish before the batchers start
+    if SEARCH_CACHE_ENABLED:
+        warm_cache_from_log(WARM_QUERIES_PATH, WARM_QUERIES_MODES, limits=WARM_QUERIES_LIMITS)
+
+    # Bulk indexing writes the same document ids from every process, so it
+    # runs here once; workers only open their own client in startup_event
+    if elastic_search.es_client is None:
+        init_elasticsearch()
+    index_product_data(get_database())
+
+    _startup_jobs_done = True
 
 # ===== API ENDPOINTS =====
 @app.on_event("startup")
@@ -121,22 +245,17 @@ async def startup_event():
     """Load data and models on application startup"""
     log_with_timestamp("STARTING TRENDYOL UNIFIED SEARCH API")
     log_with_timestamp("=" * 60)
-    log_with_timestamp("Loading application data...")
-
-    # Load database
-    load_data()
 
-    # Load AI models
-    load_all_models()
-
-    # Initialize Elasticsearch
+    # Initialize Elasticsearch (per process: clients must not cross a fork)
     log_with_timestamp("Initializing Elasticsearch for autocomplete...")
     init_elasticsearch()
 
-    # Index product data in Elasticsearch
-    df = get_database()
-    if df is not None:
-        index_product_data(df)
+    # No-op in workers when the master already preloaded everything
+    load_application_data()
+    run_startup_jobs()
+
+    encode_batcher.start()
+    predict_batcher.start()
 
     # Status check - Debug her modeli kontrol et
     log_with_timestamp("MODEL CHECK:")
@@ -172,7 +291,7 @@ async def startup_event():
         log_with_timestamp(f"     Categories: {unique_categories} unique")
 
     if hybrid_ready:
-        log_with_timestamp(f"   SBERT Embeddings: {ai_model.sbert_embs.shape[0]} products")
+        log_with_timestamp(f"   SBERT Embeddings: {ai_model.sbert_embs.shape[0]} products ({ai_model.sbert_embs.dtype}, {ai_model.sbert_embs.nbytes / 1024**2:.1f} MiB)")
         log_with_timestamp(f"   FAISS Index Size: {ai_model.faiss_index.ntotal}")
         log_with_timestamp(f"   Reranker Mode: {RERANKER_MODE}")
 
@@ -184,6 +303,12 @@ async def startup_event():
     log_with_timestamp("=" * 60)
     log_with_timestamp("APPLICATION READY FOR REQUESTS")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background batching tasks"""
+    await encode_batcher.stop()
+    await predict_batcher.stop()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -207,174 +332,260 @@ def healthz():
         "sbert_embeddings": int(ai_model.sbert_embs.shape[0]) if ai_model.sbert_embs is not None else 0
     })
 
+# ===== SEARCH HANDLERS =====
+def stream_search_response(query: str, mode: str, products: List[Dict]) -> StreamingResponse:
+    """Stream a SearchResponse body as orjson chunks, one product per chunk"""
+    async def body():
+        yield (b'{"query":' + orjson.dumps(query) + b',"mode":' + orjson.dumps(mode) +
+               b',"total_results":' + str(len(products)).encode() + b',"products":[')
+        for i, product in enumerate(products):
+            chunk = orjson.dumps(product)
+            yield b"," + chunk if i else chunk
+        yield b"]}"
+
+    return StreamingResponse(body(), media_type="application/json; charset=utf-8")
+
+# Category results are memoized in service and only replaced on reload, so
+# their JSON is encoded once per result object
+_category_json = {}
+
+def cached_json_response(name: str, result: Dict) -> Response:
+    """orjson response for a memoized result, re-encoded only when it changes"""
+    entry = _category_json.get(name)
+    if entry is None or entry[0] is not result:
+        entry = (result, orjson.dumps(result))
+        _category_json[name] = entry
+    return Response(entry[1], media_type="application/json")
+
+def _handle_ml_search(request: SearchRequest, qv=None) -> List[ProductResponse]:
+    """Semantic ML search (SBERT + reranker, TF-IDF + CatBoost fallback)"""
+    logger.debug("USING SEMANTIC SEARCH ENGINE (SBERT + Reranker)")
+    # Semantic ML search - prioritize hybrid semantic search
+    if (ai_model.sbert_model is not None and ai_model.faiss_index is not None and
+        ai_model.sbert_ids is not None and ai_model.fe is not None):
+        logger.debug("Running Semantic Search (SBERT + Advanced Reranker)...")
+        recall_k = max(request.limit*8, TOPK_RECALL_DEFAULT)
+        res_df = hybrid_semantic_search(request.query, recall_k=recall_k, return_k=request.limit, qv=qv)
+        logger.debug(f"Semantic Search completed: {res_df.height} products found")
+
+    elif ai_model.vec is not None and ai_model.X_corpus is not None and ai_model.m_click is not None and ai_model.m_order is not None and ai_model.fe is not None:
+        logger.debug("Semantic search unavailable, falling back to TF-IDF + CatBoost...")
+        topk_retrieval = max(request.limit*4, 100)
+        res_df = ml_search(request.query, topk_retrieval=topk_retrieval, topk_final=request.limit,
+                           predict=predict_batcher.submit_threadsafe)
+        logger.debug(f"TF-IDF Search completed: {res_df.height} products found")
+
+    else:
+        log_with_timestamp("No ML models available!", "ERROR")
+        raise HTTPException(status_code=500, detail="ML models not loaded")
+
+    log_column_means(res_df, {"score": "Average Semantic Score", "tfidf_sim": "Average TF-IDF Similarity"})
+
+    return format_products(res_df)
+
+def _handle_hybrid_search(request: SearchRequest, qv=None) -> List[ProductResponse]:
+    """Enhanced semantic search with full document context"""
+    logger.debug("USING ENHANCED SEMANTIC SEARCH ENGINE")
+    # Enhanced semantic search with full context
+    if (ai_model.sbert_model is None or ai_model.faiss_index is None or
+        ai_model.sbert_ids is None or ai_model.fe is None):
+        log_with_timestamp("Enhanced semantic search models not available!", "ERROR")
+        raise HTTPException(status_code=500, detail="Enhanced semantic search models not loaded")
+
+    logger.debug("Running Enhanced SBERT + Advanced Reranker pipeline...")
+    recall_k = max(request.limit*10, TOPK_RECALL_DEFAULT)  # More candidates for better quality
+    res_df = hybrid_semantic_search(request.query, recall_k=recall_k, return_k=request.limit, qv=qv)
+
+    logger.debug(f"Enhanced Semantic Search completed: {res_df.height} products found")
+    log_column_means(res_df, {"score": "Average Enhanced Semantic Score"})
+
+    return format_products(res_df)
+
+def _semantic_cached_search(handler, request: SearchRequest, mode: str, qv=None) -> List[ProductResponse]:
+    """Serve near-duplicate queries from the semantic cache, else run handler and cache its results"""
+    if qv is None:
+        return handler(request)
+
+    key = (mode, request.limit)
+    products = semantic_cache.get(qv, key)
+    if products is not None:
+        logger.debug("Semantic cache hit")
+        return products
+
+    products = handler(request, qv)
+    semantic_cache.put(qv, key, products)
+    return products
+
+def _handle_db_search(request: SearchRequest, mode: str) -> List[ProductResponse]:
+    """DB-based search with Polars filters"""
+    logger.debug("USING DATABASE SEARCH ENGINE")
+    # DB-based search
+    df = get_database()
+    if df is None:
+        log_with_timestamp("Database not available!", "ERROR")
+        raise HTTPException(status_code=500, detail="Database not loaded")
+
+    logger.debug("Running DB query with Polars filters...")
+    res_df = db_search_frame(request.query, request.limit)
+
+    logger.debug(f"DB Search completed: {res_df.height} products found")
+    log_column_means(res_df, {"selling_price": "Average Price", "content_rate_avg": "Average Rating"})
+
+    return format_products(res_df)
+
+def log_search(request: SearchRequest, mode: str, n: int, started: float, cached: bool = False):
+    """One INFO line per /search request"""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"search q={request.query!r} mode={mode} limit={request.limit} n={n} ms={elapsed_ms:.1f} cached={cached}",
+        extra={"q": request.query, "mode": mode, "n": n, "ms": elapsed_ms, "cached": cached},
+    )
+
+def warm_cache_from_log(path: str, modes: List[str], top_k: int = WARM_QUERIES_TOP_K,
+                        limits: List[int] = (50,)):
+    """Precompute /search payloads for the most frequent logged queries"""
+    if not path or not os.path.exists(path):
+        return
+
+    # Reuse the persisted payloads while the query log and data are unchanged
+    stamp = (os.path.getmtime(path), os.path.getmtime(FE_PATH) if os.path.exists(FE_PATH) else None,
+             tuple(modes), top_k, tuple(limits))
+    if os.path.exists(WARM_CACHE_PATH):
+        try:
+            saved = load(WARM_CACHE_PATH)
+            if saved["stamp"] == stamp:
+                warm_search_cache.update(saved["entries"])
+                log_with_timestamp(f"Warm search cache loaded: {len(saved['entries'])} entries")
+                return
+        except Exception as e:
+            log_with_timestamp(f"Warm search cache could not be read: {e}", "WARN")
+
+    queries = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            # Accept "query" or "query<TAB>count" lines
+            query = line.split("\t", 1)[0].strip()
+            if query:
+                queries.setdefault(query.lower(), query)
+            if len(queries) >= top_k:
+                break
+
+    handlers = {
+        "ml": _handle_ml_search,
+        "hybrid": _handle_hybrid_search,
+        "db": lambda request: _handle_db_search(request, "db"),
+    }
+    log_with_timestamp(f"Warming search cache: {len(queries)} queries x {len(modes)} modes x {len(limits)} limits...")
+    for mode in modes:
+        for limit in limits:
+            for query in queries.values():
+                try:
+                    products = handlers[mode](SearchRequest(query=query, limit=limit, mode=mode))
+                except Exception as e:
+                    log_with_timestamp(f"Warm-up failed for '{query}' ({mode}, limit={limit}): {e}", "WARN")
+                    continue
+                warm_search_cache[search_key(query, mode, limit)] = [product.model_dump() for product in products]
+
+    # Write to a temp file and swap it in, so a concurrent reader never sees a partial file
+    tmp_path = f"{WARM_CACHE_PATH}.{os.getpid()}.tmp"
+    try:
+        dump({"stamp": stamp, "entries": dict(warm_search_cache)}, tmp_path)
+        os.replace(tmp_path, WARM_CACHE_PATH)
+    except Exception as e:
+        log_with_timestamp(f"Warm search cache could not be saved: {e}", "WARN")
+    log_with_timestamp(f"Warm search cache ready: {len(warm_search_cache)} entries")
+
 @app.post("/search", response_model=SearchResponse)
 async def search_products(request: SearchRequest):
     """Main search endpoint"""
+    started = time.perf_counter()
     try:
         mode = request.mode or "db"
 
-        log_with_timestamp("=" * 60)
-        log_with_timestamp(f"NEW SEARCH REQUEST")
-        log_with_timestamp(f"Query: '{request.query}'")
-        log_with_timestamp(f"Mode: {mode.upper()}")
-        log_with_timestamp(f"Limit: {request.limit}")
-        log_with_timestamp("=" * 60)
-
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("=" * 60)
+            logger.debug("NEW SEARCH REQUEST")
+            logger.debug(f"Query: '{request.query}'")
+            logger.debug(f"Mode: {mode.upper()}")
+            logger.debug(f"Limit: {request.limit}")
+            logger.debug("=" * 60)
+
+        cache_key = search_key(request.query, mode, request.limit)
+        cached = warm_search_cache.get(cache_key)
+        if cached is None and SEARCH_CACHE_ENABLED:
+            cached = search_cache.get(cache_key)
+        if cached is not None:
+            log_search(request, mode, len(cached), started, cached=True)
+            return stream_search_response(request.query, mode, cached)
+
+        loop = asyncio.get_running_loop()
+        qv = None
+        if mode in ("ml", "hybrid") and ai_model.sbert_model is not None:
+            qv = await encode_batcher.submit(request.query)
         if mode == "ml":
-            log_with_timestamp("USING SEMANTIC SEARCH ENGINE (SBERT + Reranker)")
-            # Semantic ML search - prioritize hybrid semantic search
-            if (ai_model.sbert_model is not None and ai_model.faiss_index is not None and
-                ai_model.sbert_ids is not None and ai_model.fe is not None):
-                log_with_timestamp("Running Semantic Search (SBERT + Advanced Reranker)...")
-                recall_k = max(request.limit*8, TOPK_RECALL_DEFAULT)
-                res_df = hybrid_semantic_search(request.query, recall_k=recall_k, return_k=request.limit)
-                results = res_df.to_pandas().to_dict(orient="records")
-                log_with_timestamp(f"Semantic Search completed: {len(results)} products found")
-
-            elif ai_model.vec is not None and ai_model.X_corpus is not None and ai_model.m_click is not None and ai_model.m_order is not None and ai_model.fe is not None:
-                log_with_timestamp("Semantic search unavailable, falling back to TF-IDF + CatBoost...")
-                topk_retrieval = max(request.limit*4, 100)
-                res_df = ml_search(request.query, topk_retrieval=topk_retrieval, topk_final=request.limit)
-                results = res_df.to_pandas().to_dict(orient="records")
-                log_with_timestamp(f"TF-IDF Search completed: {len(results)} products found")
-
-            else:
-                log_with_timestamp("No ML models available!", "ERROR")
-                raise HTTPException(status_code=500, detail="ML models not loaded")
-
-            if results:
-                avg_score = sum(r.get('score', 0) for r in results) / len(results)
-                log_with_timestamp(f"Average Semantic Score: {avg_score:.4f}")
-
-            products = [format_product_response(product, mode) for product in results]
-
+            # SBERT/reranker inference runs on the dedicated rerank pool
+            products = await loop.run_in_executor(RERANK_EXECUTOR, _semantic_cached_search, _handle_ml_search, request, mode, qv)
         elif mode == "hybrid":
-            log_with_timestamp("USING ENHANCED SEMANTIC SEARCH ENGINE")
-            # Enhanced semantic search with full context
-            if (ai_model.sbert_model is None or ai_model.faiss_index is None or
-                ai_model.sbert_ids is None or ai_model.fe is None):
-                log_with_timestamp("Enhanced semantic search models not available!", "ERROR")
-                raise HTTPException(status_code=500, detail="Enhanced semantic search models not loaded")
-
-            log_with_timestamp("Running Enhanced SBERT + Advanced Reranker pipeline...")
-            recall_k = max(request.limit*10, TOPK_RECALL_DEFAULT)  # More candidates for better quality
-            res_df = hybrid_semantic_search(request.query, recall_k=recall_k, return_k=request.limit)
-            results = res_df.to_pandas().to_dict(orient="records")
-
-            log_with_timestamp(f"Enhanced Semantic Search completed: {len(results)} products found")
-            if results:
-                avg_score = sum(r.get('score', 0) for r in results) / len(results)
-                log_with_timestamp(f"Average Enhanced Semantic Score: {avg_score:.4f}")
-
-            products = [format_product_response(product, mode) for product in results]
-
+            products = await loop.run_in_executor(RERANK_EXECUTOR, _semantic_cached_search, _handle_hybrid_search, request, mode, qv)
         else:
-            log_with_timestamp("USING DATABASE SEARCH ENGINE")
-            # DB-based search
-            df = get_database()
-            if df is None:
-                log_with_timestamp("Database not available!", "ERROR")
-                raise HTTPException(status_code=500, detail="Database not loaded")
-
-            log_with_timestamp("Running DB query with Polars filters...")
-            results = db_search(request.query, request.limit)
-
-            log_with_timestamp(f"DB Search completed: {len(results)} products found")
-            if results:
-                avg_price = sum(r.get('selling_price', 0) for r in results) / len(results)
-                avg_rating = sum(r.get('content_rate_avg', 0) or 0 for r in results) / len(results)
-                log_with_timestamp(f"Average Price: {avg_price:.2f}, Average Rating: {avg_rating:.2f}")
+            products = await loop.run_in_executor(THREADPOOL, _handle_db_search, request, mode)
 
-            products = [format_product_response(product, mode) for product in results]
+        payload = [product.model_dump() for product in products]
+        if SEARCH_CACHE_ENABLED:
+            search_cache[cache_key] = payload
+        response = stream_search_response(request.query, mode, payload)
 
-        response = SearchResponse(
-            query=request.query,
-            total_results=len(products),
-            products=products,
-            mode=mode
-        )
-
-        log_with_timestamp("SEARCH COMPLETED SUCCESSFULLY")
-        log_with_timestamp(f"Final Results: {len(products)} products returned")
-        log_with_timestamp(f"Engine Used: {mode.upper()}")
-        log_with_timestamp("=" * 60)
+        log_search(request, mode, len(products), started)
 
         return response
 
     except Exception as e:
-        logging.exception("Search handler failed")
-        return JSONResponse(
-            status_code=500,
-            content={"error": str(e), "traceback": traceback.format_exc()}
-        )
+        return error_response("Search handler failed", e)
 
 @app.get("/search")
-def search_get(q: str = Query(..., description="Search query"),
-               topk: int = Query(50, ge=1, le=200),
-               mode: str = Query("ml", description="Search mode: ml, db, or hybrid")):
+async def search_get(q: str = Query(..., description="Search query"),
+                     topk: int = Query(50, ge=1, le=200),
+                     mode: str = Query("ml", description="Search mode: ml, db, or hybrid")):
     """GET endpoint for ML compatibility"""
-    try:
-        request = SearchRequest(query=q, limit=topk, mode=mode)
-        return search_products(request)
-    except Exception as e:
-        logging.exception("GET Search handler failed")
-        return JSONResponse(
-            status_code=500,
-            content={"error": str(e), "traceback": traceback.format_exc()}
-        )
+    # search_products turns its own failures into error responses
+    return await search_products(SearchRequest(query=q, limit=topk, mode=mode))
 
-@app.get("/categories")
+@app.get("/categories", dependencies=[Depends(require_database)])
 async def get_categories_endpoint():
     """Get all categories and their counts"""
-    df = get_database()
-    if df is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
-
     try:
         result = get_categories()
         if result is None:
             raise HTTPException(status_code=500, detail="Failed to get categories")
-        return result
+        return cached_json_response("categories", result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Categories error: {str(e)}")
 
-@app.get("/categories/grouped")
+@app.get("/categories/grouped", dependencies=[Depends(require_database)])
 async def get_grouped_categories_endpoint():
     """Get optimized grouped categories for frontend sidebar"""
-    df = get_database()
-    if df is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
-
     try:
         result = get_grouped_categories()
         if result is None:
             raise HTTPException(status_code=500, detail="Failed to get grouped categories")
-        return result
+        return cached_json_response("grouped", result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Grouped categories error: {str(e)}")
 
-@app.get("/popular-categories")
+@app.get("/popular-categories", dependencies=[Depends(require_database)])
 async def get_popular_categories_endpoint(limit: int = 10):
     """Get most popular categories"""
-    df = get_database()
-    if df is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
-
     try:
         result = get_popular_categories(limit)
         if result is None:
             raise HTTPException(status_code=500, detail="Failed to get popular categories")
-        return result
+        return Response(orjson.dumps(result), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Popular categories error: {str(e)}")
 
-@app.post("/search/advanced", response_model=SearchResponse)
+@app.post("/search/advanced", response_model=SearchResponse, dependencies=[Depends(require_database)])
 async def advanced_search(request: AdvancedSearchRequest):
     """Advanced search with category and price filters"""
-    df = get_database()
-    if df is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
-
     try:
         mode = request.mode or "db"
 
@@ -384,7 +595,7 @@ async def advanced_search(request: AdvancedSearchRequest):
             ml_request = SearchRequest(query=request.query, limit=request.limit, mode="ml")
             return await search_products(ml_request)
 
-        results = advanced_db_search(
+        res_df = advanced_db_search_frame(
             query=request.query,
             category_level1=request.category_level1,
             category_level2=request.category_level2,
@@ -397,14 +608,8 @@ async def advanced_search(request: AdvancedSearchRequest):
             limit=request.limit
         )
 
-        products = [format_product_response(product, mode) for product in results]
-
-        return SearchResponse(
-            query=request.query or "advanced_search",
-            total_results=len(products),
-            products=products,
-            mode=mode
-        )
+        payload = [product.model_dump() for product in format_products(res_df)]
+        return stream_search_response(request.query or "advanced_search", mode, payload)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Advanced search error: {str(e)}")
@@ -416,17 +621,22 @@ async def autocomplete(q: str = Query(..., min_length=2, description="Search que
         if len(q.strip()) < 2:
             return AutocompleteResponse(suggestions=[], total=0)
 
-        # Get suggestions from Elasticsearch
-        suggestions = get_autocomplete_suggestions(q.strip(), limit=8)
+        # Serve repeated prefixes from cache
+        key = autocomplete_key(q)
+        suggestions = autocomplete_cache.get(key)
 
-        # Fallback to database search if Elasticsearch is not available
-        if not suggestions:
-            suggestions = get_fallback_autocomplete_suggestions(q.strip(), limit=8)
+        if suggestions is None:
+            # Get suggestions from Elasticsearch
+            suggestions = get_autocomplete_suggestions(q.strip(), limit=8)
 
-        return AutocompleteResponse(
-            suggestions=suggestions,
-            total=len(suggestions)
-        )
+            # Fallback to database search if Elasticsearch is not available
+            if not suggestions:
+                suggestions = get_fallback_autocomplete_suggestions(q.strip(), limit=8)
+
+            autocomplete_cache[key] = suggestions
+
+        return Response(orjson.dumps({"suggestions": suggestions, "total": len(suggestions)}),
+                        media_type="application/json")
 
     except Exception as e:
         log_with_timestamp(f"Autocomplete error: {e}", "ERROR")
@@ -436,12 +646,17 @@ async def autocomplete(q: str = Query(..., min_length=2, description="Search que
 async def refresh_data():
     """Refresh data"""
     load_data()
+    clear_caches()
     df = get_database()
     if df is not None:
         return {"message": "Data refreshed successfully", "total_products": len(df)}
     else:
         raise HTTPException(status_code=500, detail="Failed to refresh data")
 
+# The gunicorn master runs the one-off startup jobs once, before forking workers
+if PRELOAD_MODELS:
+    run_startup_jobs()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
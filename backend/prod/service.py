@@ -1,56 +1,246 @@
 import polars as pl
-import random
-from typing import List, Dict, Optional
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Callable, List, Dict, NamedTuple, Optional, Tuple
 from config import FE_PATH, log_with_timestamp
 
 # ===== DB DATA LOADING =====
 df = None
 
+# Text columns searched case-insensitively; lowercased once in load_data()
+# into "<name>_lc" helper columns that are never returned to callers
+LC_COLUMNS = ("content_title", "level1_category_name", "level2_category_name", "leaf_category_name")
+_LC_SUFFIX = "_lc"
+# All "_lc" columns joined with a separator so a single scan covers them
+SEARCH_BLOB = "_search_blob"
+_BLOB_SEP = "\x1f"
+
+# Exact-match category filters compare integer codes instead of strings:
+# "<name>_code" is the dense rank of the name, mapped back via SearchState.codes
+CATEGORY_CODE_COLUMNS = ("level1_category_name", "level2_category_name")
+_CODE_SUFFIX = "_code"
+
+RATING_SORT_COLUMN = "content_rate_avg_f0"
+
+# Top rated products, precomputed in load_data(); db_search_frame picks its
+# no-match fallback from these instead of sampling the whole frame
+POPULAR_PRODUCTS_SIZE = 1000
+
+class SearchState(NamedTuple):
+    """Everything a search reads, built together in load_data()"""
+    frame: pl.DataFrame
+    codes: Dict[str, Dict[str, int]]
+    popular: pl.DataFrame
+
+# Replaced as a whole on reload; searches take one snapshot of it so a
+# concurrent /refresh can never mix codes of one frame with another
+_state: Optional[SearchState] = None
+
+# Product fields returned by the search functions
+RESULT_COLUMNS = [
+    "content_id_hashed", "content_title", "image_url",
+    "selling_price", "content_rate_avg", "content_review_count",
+    "level1_category_name", "level2_category_name", "leaf_category_name",
+    "original_price", "discounted_price", "merchant_count", "content_rate_count"
+]
+
+# ===== PRECOMPUTED CATEGORY AGGREGATIONS =====
+# Static between data reloads: computed in load_data(), and recomputed on the
+# next request if that failed or ran before data was available
+POPULAR_CATEGORIES_MAX = 100
+_categories = None
+_grouped_categories = None
+_popular_categories = None
+
+# Frontend sidebar groups of level1 categories
+CATEGORY_GROUPS = {
+    "Giyim & Moda": {
+        "level1_names": ["Giyim"],
+        "icon": "fas fa-tshirt",
+        "color": "#0f766e"
+    },
+    "Ayakkabı": {
+        "level1_names": ["Ayakkabı"],
+        "icon": "fas fa-shoe-prints",
+        "color": "#7c3aed"
+    },
+    "Aksesuar & Takı": {
+        "level1_names": ["Aksesuar"],
+        "icon": "fas fa-gem",
+        "color": "#dc2626"
+    },
+    "Ev & Yaşam": {
+        "level1_names": ["Ev & Mobilya", "Banyo Yapı & Hırdavat", "Bahçe & Elektrikli El Aletleri"],
+        "icon": "fas fa-home",
+        "color": "#059669"
+    },
+    "Kozmetik & Bakım": {
+        "level1_names": ["Kozmetik & Kişisel Bakım"],
+        "icon": "fas fa-spa",
+        "color": "#ec4899"
+    },
+    "Spor & Eğlence": {
+        "level1_names": ["Spor & Outdoor", "Hobi & Eğlence"],
+        "icon": "fas fa-dumbbell",
+        "color": "#f59e0b"
+    },
+    "Anne & Bebek": {
+        "level1_names": ["Anne & Bebek & Çocuk"],
+        "icon": "fas fa-baby",
+        "color": "#06b6d4"
+    },
+    "Teknoloji & Diğer": {
+        "level1_names": ["Elektronik", "Otomobil & Motosiklet", "Kırtasiye & Ofis Malzemeleri", "Kitap", "Süpermarket", "Ek Hizmetler", "unknown"],
+        "icon": "fas fa-laptop",
+        "color": "#6366f1"
+    }
+}
+
+GROUP_SUBCATEGORY_LIMIT = 15
+
+_L1_TO_GROUP = {
+    level1_name: group_name
+    for group_name, group_info in CATEGORY_GROUPS.items()
+    for level1_name in group_info["level1_names"]
+}
+
+# ===== AUTOCOMPLETE INDEX =====
+# Unique lowercase titles in sorted order (bisect prefix lookup), the
+# (title, level2 category) pair for each, and the unique level2 names
+AUTOCOMPLETE_TITLE_LIMIT = 5
+# Rows per slice when topping up titles with a substring scan; the scan
+# stops at the first slice that completes the suggestions
+AUTOCOMPLETE_SCAN_CHUNK = 65536
+_title_keys = None
+_title_rows = None
+_level2_names = None
+
 def load_data():
     """Load database data"""
-    global df
+    global df, _state
     try:
         log_with_timestamp("Loading DB data...")
-        df = pl.read_parquet(FE_PATH)
-        log_with_timestamp(f"DB Data loaded successfully: {len(df)} products, {len(df.columns)} columns")
+        # Only the product fields are used; the helper columns derive from them
+        frame = pl.read_parquet(FE_PATH, columns=RESULT_COLUMNS, memory_map=True).with_columns([
+            pl.col(c).str.to_lowercase().alias(c + _LC_SUFFIX) for c in LC_COLUMNS
+        ])
+        frame = frame.with_columns(
+            pl.concat_str(
+                [pl.col(c + _LC_SUFFIX).fill_null("") for c in LC_COLUMNS],
+                separator=_BLOB_SEP
+            ).alias(SEARCH_BLOB),
+            # Null ratings sort and filter as 0
+            pl.col("content_rate_avg").fill_null(0).alias(RATING_SORT_COLUMN),
+            *[pl.col(c).rank("dense").cast(pl.UInt32).alias(c + _CODE_SUFFIX) for c in CATEGORY_CODE_COLUMNS]
+        )
+        codes = build_category_codes(frame)
+        popular = _top_rated(frame.lazy(), POPULAR_PRODUCTS_SIZE).select(RESULT_COLUMNS).collect()
+        # Searches run in worker threads during /refresh: publish the fully
+        # built frame and everything derived from it as one object
+        _state = SearchState(frame, codes, popular)
+        df = frame
+        log_with_timestamp(f"DB Data loaded successfully: {len(frame)} products, {len(frame.columns)} columns")
         # Show sample categories
-        sample_categories = df.select("level2_category_name").unique().head(5).to_series().to_list()
+        sample_categories = frame.select("level2_category_name").unique().head(5).to_series().to_list()
         log_with_timestamp(f"Sample categories: {', '.join(sample_categories[:3])}...")
     except Exception as e:
         log_with_timestamp(f"DB Data loading failed: {e}", "ERROR")
+        _state = None
         df = None
 
-def db_search(query: str, limit: int = 50) -> List[Dict]:
+    precompute_category_stats()
+    build_autocomplete_index()
+
+def precompute_category_stats():
+    """Compute category aggregations once for the loaded data"""
+    global _categories, _grouped_categories, _popular_categories
+    _categories = _compute_categories()
+    _grouped_categories = _compute_grouped_categories()
+    _popular_categories = _compute_popular_categories(POPULAR_CATEGORIES_MAX)
+    if df is not None:
+        log_with_timestamp("Category aggregations precomputed")
+
+def build_category_codes(frame: pl.DataFrame) -> Dict[str, Dict[str, int]]:
+    """Map category names to their integer codes in frame"""
+    codes = {}
+    for c in CATEGORY_CODE_COLUMNS:
+        pairs = frame.select(c, c + _CODE_SUFFIX).drop_nulls().unique()
+        codes[c] = dict(zip(pairs[c].to_list(), pairs[c + _CODE_SUFFIX].to_list()))
+    return codes
+
+def _category_in(column: str, names: List[str], category_codes: Dict[str, Dict[str, int]]) -> pl.Expr:
+    """Filter column to names, on integer codes when all names are known"""
+    codes = category_codes.get(column)
+    if codes is None or any(name not in codes for name in names):
+        if len(names) == 1:
+            return pl.col(column) == names[0]
+        return pl.col(column).is_in(names)
+    if len(names) == 1:
+        return pl.col(column + _CODE_SUFFIX) == codes[names[0]]
+    return pl.col(column + _CODE_SUFFIX).is_in([codes[name] for name in names])
+
+def _text_match(query_lower: str) -> pl.Expr:
+    """Substring match of query_lower against any searchable text column"""
+    return pl.col(SEARCH_BLOB).str.contains(query_lower, literal=True)
+
+_RATING_KEYS = [RATING_SORT_COLUMN, "content_review_count"]
+
+def _top_rated(lf: pl.LazyFrame, limit: int) -> pl.LazyFrame:
+    """limit best rated, then most reviewed rows, in that order"""
+    return lf.top_k(limit, by=_RATING_KEYS).sort(_RATING_KEYS, descending=[True, True])
+
+def db_search_frame(query: str, limit: int = 50) -> pl.DataFrame:
     """Perform database-based search using Polars filtering"""
-    if df is None:
-        return []
+    state = _state
+    if state is None:
+        return pl.DataFrame()
 
     # Simple category filtering
     if query.lower().strip():
         query_lower = query.lower()
 
-        # Search in categories and title
-        filtered = df.filter(
-            pl.col("content_title").str.to_lowercase().str.contains(query_lower) |
-            pl.col("level1_category_name").str.to_lowercase().str.contains(query_lower) |
-            pl.col("level2_category_name").str.to_lowercase().str.contains(query_lower) |
-            pl.col("leaf_category_name").str.to_lowercase().str.contains(query_lower)
-        )
+        # Search in categories and title, best rated matches first
+        found = _top_rated(
+            state.frame.lazy().filter(_text_match(query_lower)), limit
+        ).select(RESULT_COLUMNS).collect()
+
+        if found.height > 0:
+            return found
+
+    # Return random products from the top rated ones
+    return state.popular.sample(min(limit, state.popular.height))
+
+# Expression builders for the advanced_db_search_frame filters, in the order of
+# its values/active tuples; each takes the value and the snapshot's category codes
+_ADVANCED_FILTERS = (
+    # Category filters
+    lambda v, codes: _category_in("level1_category_name", [v], codes),
+    lambda v, codes: _category_in("level2_category_name", v, codes),
+    lambda v, codes: _category_in("level2_category_name", [v], codes),
+    lambda v, codes: pl.col("leaf_category_name_lc").str.contains(v.lower(), literal=True),
+    # Price filters
+    lambda v, codes: pl.col("selling_price") >= v,
+    lambda v, codes: pl.col("selling_price") <= v,
+    # Rating filters
+    lambda v, codes: pl.col(RATING_SORT_COLUMN) >= v,
+    lambda v, codes: pl.col("content_review_count") >= v,
+    # Text search
+    lambda v, codes: _text_match(v.lower()),
+)
 
-        if len(filtered) > 0:
-            # Sort by rating
-            sample_size = min(limit * 2, len(filtered))
-            sampled = filtered.sample(sample_size) if len(filtered) > sample_size else filtered
-            sorted_results = sampled.sort([
-                pl.col("content_rate_avg").fill_null(0),
-                pl.col("content_review_count")
-            ], descending=[True, True])
-            return sorted_results.head(limit).to_dicts()
+@lru_cache(maxsize=64)
+def _advanced_filter_builder(active: Tuple[bool, ...]) -> Callable[[tuple, Dict], Optional[pl.Expr]]:
+    """Predicate builder for one combination of active filters"""
+    steps = [(i, build) for i, (build, on) in enumerate(zip(_ADVANCED_FILTERS, active)) if on]
 
-    # Return random products
-    return df.sample(min(limit, len(df))).to_dicts()
+    def build_predicate(values: tuple, codes: Dict[str, Dict[str, int]]) -> Optional[pl.Expr]:
+        if not steps:
+            return None
+        return pl.all_horizontal([build(values[i], codes) for i, build in steps])
 
-def advanced_db_search(query: str = "", category_level1: Optional[str] = None,
+    return build_predicate
+
+def advanced_db_search_frame(query: str = "", category_level1: Optional[str] = None,
                       category_level2: Optional[str] = None,
                       category_level2_list: Optional[List[str]] = None,
                       category_leaf: Optional[str] = None,
@@ -58,76 +248,41 @@ def advanced_db_search(query: str = "", category_level1: Optional[str] = None,
                       max_price: Optional[float] = None,
                       min_rating: Optional[float] = None,
                       min_review_count: Optional[int] = None,
-                      limit: int = 50) -> List[Dict]:
+                      limit: int = 50) -> pl.DataFrame:
     """Perform advanced database search with filters"""
-    if df is None:
-        return []
-
-    filtered_df = df
-
-    # Category filters
-    if category_level1:
-        filtered_df = filtered_df.filter(
-            pl.col("level1_category_name") == category_level1
-        )
-
-    # Multi-category filtering (OR logic)
-    if category_level2_list and len(category_level2_list) > 0:
-        filtered_df = filtered_df.filter(
-            pl.col("level2_category_name").is_in(category_level2_list)
-        )
-    elif category_level2:
-        filtered_df = filtered_df.filter(
-            pl.col("level2_category_name") == category_level2
-        )
-
-    if category_leaf:
-        filtered_df = filtered_df.filter(
-            pl.col("leaf_category_name").str.to_lowercase().str.contains(category_leaf.lower())
-        )
-
-    # Price filters
-    if min_price is not None:
-        filtered_df = filtered_df.filter(pl.col("selling_price") >= min_price)
-
-    if max_price is not None:
-        filtered_df = filtered_df.filter(pl.col("selling_price") <= max_price)
-
-    # Rating filters
-    if min_rating is not None:
-        filtered_df = filtered_df.filter(
-            pl.col("content_rate_avg").fill_null(0) >= min_rating
-        )
-
-    if min_review_count is not None:
-        filtered_df = filtered_df.filter(
-            pl.col("content_review_count") >= min_review_count
-        )
-
-    # Text search
-    if query.strip():
-        query_lower = query.lower()
-        filtered_df = filtered_df.filter(
-            pl.col("content_title").str.to_lowercase().str.contains(query_lower) |
-            pl.col("level1_category_name").str.to_lowercase().str.contains(query_lower) |
-            pl.col("level2_category_name").str.to_lowercase().str.contains(query_lower) |
-            pl.col("leaf_category_name").str.to_lowercase().str.contains(query_lower)
-        )
-
-    # Sort and limit
-    if len(filtered_df) > 0:
-        sorted_results = filtered_df.sort([
-            pl.col("content_rate_avg").fill_null(0),
-            pl.col("content_review_count")
-        ], descending=[True, True]).head(limit)
-        results = sorted_results.to_dicts()
-    else:
-        results = []
-
-    return results
+    state = _state
+    if state is None:
+        return pl.DataFrame()
+
+    # Multi-category filtering (OR logic) takes precedence over a single level2
+    if category_level2_list:
+        category_level2 = None
+    values = (
+        category_level1, category_level2_list, category_level2, category_leaf,
+        min_price, max_price, min_rating, min_review_count, query
+    )
+    active = (
+        bool(category_level1), bool(category_level2_list), bool(category_level2), bool(category_leaf),
+        min_price is not None, max_price is not None, min_rating is not None, min_review_count is not None,
+        bool(query.strip())
+    )
+    predicate = _advanced_filter_builder(active)(values, state.codes)
+
+    # Single fused filter, then sort and limit
+    lf = state.frame.lazy()
+    if predicate is not None:
+        lf = lf.filter(predicate)
+    return _top_rated(lf, limit).select(RESULT_COLUMNS).collect()
 
 def get_categories():
     """Get all categories and their counts"""
+    global _categories
+    if _categories is None:
+        _categories = _compute_categories()
+    return _categories
+
+def _compute_categories():
+    """Aggregate all categories and their counts"""
     if df is None:
         return None
 
@@ -158,6 +313,13 @@ def get_categories():
 
 def get_grouped_categories():
     """Get optimized grouped categories for frontend sidebar"""
+    global _grouped_categories
+    if _grouped_categories is None:
+        _grouped_categories = _compute_grouped_categories()
+    return _grouped_categories
+
+def _compute_grouped_categories():
+    """Aggregate level2 categories into frontend sidebar groups"""
     if df is None:
         return None
 
@@ -167,65 +329,21 @@ def get_grouped_categories():
             pl.len().alias("product_count")
         ]).sort("product_count", descending=True)
 
-        # Category groups
-        category_groups = {
-            "Giyim & Moda": {
-                "level1_names": ["Giyim"],
-                "icon": "fas fa-tshirt",
-                "color": "#0f766e"
-            },
-            "Ayakkabı": {
-                "level1_names": ["Ayakkabı"],
-                "icon": "fas fa-shoe-prints",
-                "color": "#7c3aed"
-            },
-            "Aksesuar & Takı": {
-                "level1_names": ["Aksesuar"],
-                "icon": "fas fa-gem",
-                "color": "#dc2626"
-            },
-            "Ev & Yaşam": {
-                "level1_names": ["Ev & Mobilya", "Banyo Yapı & Hırdavat", "Bahçe & Elektrikli El Aletleri"],
-                "icon": "fas fa-home",
-                "color": "#059669"
-            },
-            "Kozmetik & Bakım": {
-                "level1_names": ["Kozmetik & Kişisel Bakım"],
-                "icon": "fas fa-spa",
-                "color": "#ec4899"
-            },
-            "Spor & Eğlence": {
-                "level1_names": ["Spor & Outdoor", "Hobi & Eğlence"],
-                "icon": "fas fa-dumbbell",
-                "color": "#f59e0b"
-            },
-            "Anne & Bebek": {
-                "level1_names": ["Anne & Bebek & Çocuk"],
-                "icon": "fas fa-baby",
-                "color": "#06b6d4"
-            },
-            "Teknoloji & Diğer": {
-                "level1_names": ["Elektronik", "Otomobil & Motosiklet", "Kırtasiye & Ofis Malzemeleri", "Kitap", "Süpermarket", "Ek Hizmetler", "unknown"],
-                "icon": "fas fa-laptop",
-                "color": "#6366f1"
-            }
-        }
+        # Bucket level2 categories by group in a single pass; rows come most
+        # popular first, so each group keeps its first 15
+        grouped = {group_name: [] for group_name in CATEGORY_GROUPS}
+        for category in level2_stats.iter_rows(named=True):
+            group_name = _L1_TO_GROUP.get(category["level1_category_name"])
+            if group_name is not None and len(grouped[group_name]) < GROUP_SUBCATEGORY_LIMIT:
+                grouped[group_name].append({
+                    "name": category["level2_category_name"],
+                    "count": category["product_count"],
+                    "level1_parent": category["level1_category_name"]
+                })
 
         result = {}
-        level2_data = level2_stats.to_dicts()
-
-        for group_name, group_info in category_groups.items():
-            subcategories = []
-            for category in level2_data:
-                if category["level1_category_name"] in group_info["level1_names"]:
-                    subcategories.append({
-                        "name": category["level2_category_name"],
-                        "count": category["product_count"],
-                        "level1_parent": category["level1_category_name"]
-                    })
-
-            # Take top 15 most popular categories
-            subcategories = sorted(subcategories, key=lambda x: x["count"], reverse=True)[:15]
+        for group_name, group_info in CATEGORY_GROUPS.items():
+            subcategories = grouped[group_name]
 
             if subcategories:  # Don't include empty groups
                 result[group_name] = {
@@ -245,6 +363,21 @@ def get_grouped_categories():
 
 def get_popular_categories(limit: int = 10):
     """Get most popular categories"""
+    global _popular_categories
+    if limit > POPULAR_CATEGORIES_MAX:
+        return _compute_popular_categories(limit)
+    if _popular_categories is None:
+        _popular_categories = _compute_popular_categories(POPULAR_CATEGORIES_MAX)
+        if _popular_categories is None:
+            return None
+
+    return {
+        "popular_categories": _popular_categories["popular_categories"][:limit],
+        "total_categories": _popular_categories["total_categories"]
+    }
+
+def _compute_popular_categories(limit: int):
+    """Aggregate most popular level2 categories"""
     if df is None:
         return None
 
@@ -260,11 +393,58 @@ def get_popular_categories(limit: int = 10):
 
         return {
             "popular_categories": popular.to_dicts(),
-            "total_categories": len(df.select("level2_category_name").unique())
+            "total_categories": df["level2_category_name"].n_unique()
         }
     except Exception as e:
         return None
 
+def build_autocomplete_index():
+    """Build the sorted title and category lists used by fallback autocomplete"""
+    global _title_keys, _title_rows, _level2_names
+    if df is None:
+        _title_keys = _title_rows = _level2_names = None
+        return
+
+    titles = (
+        df.select("content_title_lc", "content_title", "level2_category_name")
+        .drop_nulls("content_title_lc")
+        .unique(subset="content_title_lc", keep="first", maintain_order=True)
+        .sort("content_title_lc")
+    )
+    _title_keys = titles["content_title_lc"].to_list()
+    _title_rows = list(zip(titles["content_title"].to_list(), titles["level2_category_name"].to_list()))
+    _level2_names = [
+        (name.lower(), name)
+        for name in df["level2_category_name"].drop_nulls().unique().sort().to_list()
+    ]
+    log_with_timestamp(f"Autocomplete index built: {len(_title_keys)} titles, {len(_level2_names)} categories")
+
+def _title_prefix_matches(query_lower: str, limit: int) -> List[tuple]:
+    """Titles starting with query_lower, via bisect on the sorted keys"""
+    matches = []
+    i = bisect_left(_title_keys, query_lower)
+    while i < len(_title_keys) and len(matches) < limit and _title_keys[i].startswith(query_lower):
+        matches.append(_title_rows[i])
+        i += 1
+    return matches
+
+def _title_substring_matches(query_lower: str, exclude: set, limit: int) -> List[tuple]:
+    """Titles containing query_lower, scanned slice by slice until limit is reached"""
+    matches = []
+    for offset in range(0, df.height, AUTOCOMPLETE_SCAN_CHUNK):
+        found = (
+            df.slice(offset, AUTOCOMPLETE_SCAN_CHUNK).lazy()
+            .filter(pl.col("content_title_lc").str.contains(query_lower, literal=True))
+            .filter(~pl.col("content_title").is_in(list(exclude)))
+            .select("content_title", "level2_category_name")
+            .head(limit - len(matches))
+            .collect()
+        )
+        matches.extend(found.iter_rows())
+        if len(matches) >= limit:
+            break
+    return matches
+
 def get_fallback_autocomplete_suggestions(query: str, limit: int = 8) -> List[Dict]:
     """Get autocomplete suggestions from database fallback"""
     if df is None or not query or len(query) < 2:
@@ -273,31 +453,36 @@ def get_fallback_autocomplete_suggestions(query: str, limit: int = 8) -> List[Di
     try:
         query_lower = query.lower().strip()
 
-        # Get product titles
-        title_matches = df.filter(
-            pl.col("content_title").str.to_lowercase().str.contains(query_lower)
-        ).select("content_title", "level2_category_name").head(5)
+        if _title_keys is None:
+            build_autocomplete_index()
+
+        # Get product titles: prefix matches from the index, topped up with
+        # substring matches from a column scan only when there are too few
+        title_matches = _title_prefix_matches(query_lower, AUTOCOMPLETE_TITLE_LIMIT)
+        if len(title_matches) < AUTOCOMPLETE_TITLE_LIMIT:
+            seen = {title for title, _ in title_matches}
+            title_matches.extend(_title_substring_matches(
+                query_lower, seen, AUTOCOMPLETE_TITLE_LIMIT - len(title_matches)
+            ))
 
         # Get category matches
-        category_matches = df.filter(
-            pl.col("level2_category_name").str.to_lowercase().str.contains(query_lower)
-        ).select("level2_category_name").unique().head(3)
+        category_matches = [name for name_lc, name in _level2_names if query_lower in name_lc][:3]
 
         suggestions = []
 
         # Add product suggestions
-        for row in title_matches.to_dicts():
-            title = row.get('content_title', '').strip()
+        for title, category in title_matches:
+            title = (title or '').strip()
             if title and title != 'Lorem Ipsum':
                 suggestions.append({
                     "text": title,
                     "type": "product",
-                    "category": row.get('level2_category_name', '')
+                    "category": category or ''
                 })
 
         # Add category suggestions
-        for row in category_matches.to_dicts():
-            cat = row.get('level2_category_name', '').strip()
+        for cat in category_matches:
+            cat = cat.strip()
             if cat:
                 suggestions.append({
                     "text": cat,
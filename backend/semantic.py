@@ -70,39 +70,18 @@ def search(
         # --- BURADA reranker bloğu başlıyor ---
         if reranker is not None:
             doc_texts = [
-                build_doc_text(r.get("content_title"), r.get("level2_category_name"), r.get("leaf_category_name"))
-                for r in df.to_dicts()
+                build_doc_text(title, level2, leaf)
+                for title, level2, leaf in df.select(
+                    "content_title", "level2_category_name", "leaf_category_name"
+                ).iter_rows()
             ]
-            rerank_scores = reranker.score(q, doc_texts)
-
-            order_idx = np.argsort(-rerank_scores)[:topk].astype(np.int64)
-            rank_df   = pl.DataFrame({
-                "__row": order_idx,
-                "__rank": np.arange(len(order_idx), dtype=np.int64)
-            })
-
-            out = (
-                df.with_row_index("__row")
-                  .join(rank_df, on="__row", how="inner")
-                  .sort("__rank")
-                  .drop(["__row","__rank"])
-                  .with_columns(pl.Series("score", rerank_scores[order_idx].astype(np.float32)))
-            )
-
+            scores = reranker.score(q, doc_texts)
         else:
-            order_idx = np.argsort(-sims)[:topk].astype(np.int64)
-            rank_df   = pl.DataFrame({
-                "__row": order_idx,
-                "__rank": np.arange(len(order_idx), dtype=np.int64)
-            })
+            scores = sims
 
-            out = (
-                df.with_row_index("__row")
-                  .join(rank_df, on="__row", how="inner")
-                  .sort("__rank")
-                  .drop(["__row","__rank"])
-                  .with_columns(pl.Series("score", sims[order_idx].astype(np.float32)))
-            )
+        # Reorder by score with a positional gather
+        order_idx = np.argsort(-scores)[:topk].astype(np.int64)
+        out = df[order_idx].with_columns(pl.Series("score", scores[order_idx].astype(np.float32)))
 
         return out.select([
             "content_id_hashed","content_title","image_url",
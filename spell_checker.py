@@ -2,9 +2,165 @@
 # -*- coding: utf-8 -*-
 
 import re
-from typing import Dict, List, Set, Optional
-from difflib import SequenceMatcher
+import string
+import sys
+from functools import cached_property, lru_cache
+from itertools import chain, combinations
+from typing import Dict, List, Set, Optional, Tuple
+from difflib import SequenceMatcher, get_close_matches
 import unicodedata
+from types import MappingProxyType
+
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    njit = None
+
+# SymSpell silme indeksinin kapsadığı en fazla silme sayısı
+_SYMSPELL_MAX_DELETES = 2
+
+def _delete_variants(word: str, max_deletes: int = _SYMSPELL_MAX_DELETES) -> Set[str]:
+    """word'den en fazla max_deletes karakter silinerek elde edilen stringler (kendisi dahil)."""
+    variants = {word}
+    for k in range(1, min(max_deletes, len(word)) + 1):
+        for positions in combinations(range(len(word)), k):
+            variants.add(''.join(ch for i, ch in enumerate(word) if i not in positions))
+    return variants
+
+# Bit-parallel edit distance keeps one bit per character of the shorter string
+_BP_MAX_LEN = 64
+
+def _bp_edit_distance(a: str, b: str) -> int:
+    """Levenshtein mesafesi (Myers/Hyyrö bit-parallel algoritması)."""
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(b)
+    if m == 0:
+        return len(a)
+
+    # Kısa string'deki her karakterin pozisyon maskesi
+    peq = {}
+    for i, c in enumerate(b):
+        peq[c] = peq.get(c, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, dist = mask, 0, m
+    for c in a:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & high:
+            dist += 1
+        elif mh & high:
+            dist -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+    return dist
+
+if njit is not None:
+    @njit(cache=True)
+    def _best_match_numba(peq, word_len, dict_idx, dict_lens, threshold):
+        """Sözlüğün tamamında _bp_edit_distance ile aynı skorlama; (en iyi satır, skor) döndürür.
+
+        peq: sorgunun alfabe indeksine göre pozisyon maskeleri, dict_idx: alfabe
+        indeksleriyle kodlanmış sözlük satırları (dict_lens kadar geçerli).
+        """
+        one = np.uint64(1)
+        if word_len == 64:
+            mask = ~np.uint64(0)
+        else:
+            mask = (one << np.uint64(word_len)) - one
+        high = one << np.uint64(word_len - 1)
+        best_idx = -1
+        best_score = threshold
+        for r in range(dict_idx.shape[0]):
+            n = dict_lens[r]
+            longest = max(word_len, n)
+            # Uzunluk farkı tek başına best_score'u geçmeyi engelliyorsa atla
+            if 1.0 - (longest - min(word_len, n)) / longest <= best_score:
+                continue
+            pv = mask
+            mv = np.uint64(0)
+            dist = word_len
+            for j in range(n):
+                eq = peq[dict_idx[r, j]]
+                xv = eq | mv
+                xh = (((eq & pv) + pv) ^ pv) | eq
+                ph = mv | ~(xh | pv)
+                mh = pv & xh
+                if ph & high:
+                    dist += 1
+                elif mh & high:
+                    dist -= 1
+                ph = ((ph << one) | one) & mask
+                mh = (mh << one) & mask
+                pv = (mh | ~(xv | ph)) & mask
+                mv = ph & xv
+            score = 1.0 - dist / longest
+            if score > best_score:
+                best_idx = r
+                best_score = score
+        return best_idx, best_score
+
+def _max_similarity(len_a: int, len_b: int) -> float:
+    """Uzunluk farkından gelen edit mesafesi alt sınırıyla ulaşılabilecek en yüksek skor.
+
+    similarity ile aynı float ifadesi kullanılır, böylece gerçek skor bunu geçemez.
+    """
+    longest = max(len_a, len_b)
+    return 1.0 - (longest - min(len_a, len_b)) / longest
+
+# Yaygın yazım hataları ve düzeltmeleri (tüm instance'lar paylaşır).
+# Sözlükteki kelimeler correct_word'de zaten doğrudan kabul edilir. Anahtar ve
+# değerler intern edilir: intern edilmiş sorgu kelimeleriyle karşılaştırma
+# kimlik kontrolüne iner.
+_CORRECTIONS = MappingProxyType({sys.intern(k): sys.intern(v) for k, v in {
+    # Türkçe karakter hataları
+    'kozmetık': 'kozmetik',
+    'gıyım': 'giyim',
+    'giyım': 'giyim',
+    'bılgısayar': 'bilgisayar',
+    'ayakabı': 'ayakkabı',
+    'cocuk': 'çocuk',
+    'kadin': 'kadın',
+    'sıyah': 'siyah',
+    'kirmizi': 'kırmızı',
+    'mavı': 'mavi',
+    'yeşıl': 'yeşil',
+    'yesil': 'yeşil',
+    'sari': 'sarı',
+
+    # İngilizce-Türkçe karışımları
+    'phone': 'telefon',
+    'computer': 'bilgisayar',
+    'shoes': 'ayakkabı',
+    'dress': 'elbise',
+    'shirt': 'gömlek',
+    'pants': 'pantolon',
+    'bag': 'çanta',
+    'black': 'siyah',
+    'white': 'beyaz',
+    'red': 'kırmızı',
+    'blue': 'mavi',
+    'green': 'yeşil',
+    'yellow': 'sarı',
+
+    # Yaygın typo'lar
+    'gyim': 'giyim',
+    'giim': 'giyim',
+    'kozmetic': 'kozmetik',
+    'kozmetıc': 'kozmetik',
+    'teleofn': 'telefon',
+    'teleon': 'telefon',
+    'telfon': 'telefon',
+    'bilgisaar': 'bilgisayar',
+}.items()})
 
 class TurkishSpellChecker:
     """
@@ -12,6 +168,16 @@ class TurkishSpellChecker:
     Yaygın yazım hatalarını düzeltir ve önerilerde bulunur.
     """
     
+    # Derlenmiş regex'ler
+    _HTML_ENT_RE = re.compile(r'&[a-zA-Z0-9#]+;')
+    _WS_RE = re.compile(r'\s+')
+    _WORD_RE = re.compile(r'\b\w+\b')
+    
+    # Noktalama -> boşluk ('_' \w kapsamında olduğu için korunur)
+    _PUNCT_TABLE = str.maketrans({
+        c: ' ' for c in (string.punctuation + '’‘“”«»…').replace('_', '')
+    })
+    
     def __init__(self):
         # Türkçe yaygın kelimeler ve ürün kategorileri
         self.dictionary = {
@@ -49,139 +215,222 @@ class TurkishSpellChecker:
             'nike', 'adidas', 'puma', 'samsung', 'apple', 'xiaomi', 'huawei', 'oppo',
             'vivo', 'realme', 'lg', 'sony', 'zara', 'mango', 'koton', 'lcw', 'defacto',
         }
+        # Değişmez, küçük harfli ve intern edilmiş sözlük ve sabit sıralı kopyası
+        self.dictionary = frozenset(sys.intern(w.lower()) for w in self.dictionary)
+        self._dict_tuple = tuple(self.dictionary)
         
         # Yaygın yazım hataları ve düzeltmeleri
-        self.corrections = {
-            # Türkçe karakter hataları
-            'kozmetık': 'kozmetik',
-            'gıyım': 'giyim',
-            'giyım': 'giyim',
-            'telefon': 'telefon',
-            'bılgısayar': 'bilgisayar',
-            'bilgisayar': 'bilgisayar',
-            'ayakabı': 'ayakkabı',
-            'ayakkabı': 'ayakkabı',
-            'çocuk': 'çocuk',
-            'cocuk': 'çocuk',
-            'kadın': 'kadın',
-            'kadin': 'kadın',
-            'erkek': 'erkek',
-            'sıyah': 'siyah',
-            'siyah': 'siyah',
-            'beyaz': 'beyaz',
-            'kırmızı': 'kırmızı',
-            'kirmizi': 'kırmızı',
-            'mavı': 'mavi',
-            'mavi': 'mavi',
-            'yeşıl': 'yeşil',
-            'yesil': 'yeşil',
-            'sarı': 'sarı',
-            'sari': 'sarı',
-            
-            # İngilizce-Türkçe karışımları
-            'phone': 'telefon',
-            'computer': 'bilgisayar',
-            'laptop': 'laptop',
-            'shoes': 'ayakkabı',
-            'dress': 'elbise',
-            'shirt': 'gömlek',
-            'pants': 'pantolon',
-            'bag': 'çanta',
-            'black': 'siyah',
-            'white': 'beyaz',
-            'red': 'kırmızı',
-            'blue': 'mavi',
-            'green': 'yeşil',
-            'yellow': 'sarı',
-            
-            # Yaygın typo'lar
-            'giyim': 'giyim',
-            'gyim': 'giyim',
-            'giim': 'giyim',
-            'giyim': 'giyim',
-            'kozmetık': 'kozmetik',
-            'kozmetic': 'kozmetik',
-            'kozmetıc': 'kozmetik',
-            'teleofn': 'telefon',
-            'teleon': 'telefon',
-            'telfon': 'telefon',
-            'bilgisaar': 'bilgisayar',
-            'bilgisayar': 'bilgisayar',
-            'bılgısayar': 'bilgisayar',
-        }
+        self.corrections = _CORRECTIONS
         
         # Türkçe karakterlerin Latin karşılıkları
         self.turkish_char_map = {
             'ç': 'c', 'ğ': 'g', 'ı': 'i', 'ö': 'o', 'ş': 's', 'ü': 'u',
             'Ç': 'C', 'Ğ': 'G', 'İ': 'I', 'Ö': 'O', 'Ş': 'S', 'Ü': 'U'
         }
+        self._latin_table = str.maketrans(self.turkish_char_map)
+        
+        # Instance başına önbellekler: sorgularda aynı kelimeler tekrar tekrar geçer
+        self._correct_word_scored = lru_cache(maxsize=100_000)(self._correct_word_scored)
+        self.normalize_turkish = lru_cache(maxsize=8192)(self.normalize_turkish)
+        self.to_latin = lru_cache(maxsize=8192)(self.to_latin)
+        
+        # SymSpell, uzunluk kovaları ve Latin formlar yalnızca bulanık
+        # aramada gerekir; aşağıdaki cached_property'lerle ilk kullanımda kurulur
+    
+    @cached_property
+    def _dict_latin(self) -> Tuple[str, ...]:
+        """Sözlük kelimelerinin Latin formları (_dict_tuple ile paralel)."""
+        return tuple(w.translate(self._latin_table) for w in self._dict_tuple)
+    
+    @cached_property
+    def _latin_dict(self) -> Dict[str, str]:
+        """Sözlük kelimesi -> Latin formu."""
+        return dict(zip(self._dict_tuple, self._dict_latin))
+    
+    @cached_property
+    def _by_len(self) -> Dict[int, Tuple[Tuple[str, str], ...]]:
+        """Uzunluk -> (kelime, Latin form) kovaları; tam taramada uzunluk sınırı için."""
+        by_len = {}
+        for word, latin in zip(self._dict_tuple, self._dict_latin):
+            by_len.setdefault(len(latin), []).append((word, latin))
+        return {length: tuple(bucket) for length, bucket in by_len.items()}
+    
+    @cached_property
+    def _max_len(self) -> int:
+        """En uzun sözlük kelimesinin uzunluğu."""
+        return max(self._by_len)
+    
+    @cached_property
+    def _numba_tables(self) -> tuple:
+        """Numba tam tarama için (alfabe indeksi, kodlanmış Latin formlar, uzunluklar)."""
+        alphabet = sorted(set(''.join(self._dict_latin)))
+        alpha_index = {ch: i for i, ch in enumerate(alphabet)}
+        codes = np.zeros((len(self._dict_latin), self._max_len), dtype=np.int32)
+        lens = np.fromiter(map(len, self._dict_latin), dtype=np.int64,
+                           count=len(self._dict_latin))
+        for row, latin in enumerate(self._dict_latin):
+            codes[row, :len(latin)] = [alpha_index[ch] for ch in latin]
+        return alpha_index, codes, lens
+    
+    @cached_property
+    def _delete_index(self) -> Dict[str, List[str]]:
+        """SymSpell: Latin formlardan silme varyantı -> sözlük kelimeleri."""
+        deletes = {}
+        for word, latin in zip(self._dict_tuple, self._dict_latin):
+            for variant in _delete_variants(latin):
+                deletes.setdefault(variant, []).append(word)
+        return deletes
+    
+    def _symspell_lookup(self, word: str) -> Set[str]:
+        """Latin formu word ile ortak bir silme varyantı olan sözlük kelimeleri."""
+        candidates = set()
+        for variant in _delete_variants(word):
+            candidates.update(self._delete_index.get(variant, ()))
+        return candidates
     
     def normalize_turkish(self, text: str) -> str:
         """Türkçe karakterleri normalize eder."""
-        text = unicodedata.normalize('NFKC', text)
+        # ASCII metin zaten NFKC; diğerleri için önce hızlı kontrol
+        if not text.isascii() and not unicodedata.is_normalized('NFKC', text):
+            text = unicodedata.normalize('NFKC', text)
         return text.lower().strip()
     
     def to_latin(self, text: str) -> str:
         """Türkçe karakterleri Latin karakterlere çevirir."""
-        for turkish, latin in self.turkish_char_map.items():
-            text = text.replace(turkish, latin)
-        return text
+        return text.translate(self._latin_table)
     
     def clean_query(self, query: str) -> str:
         """Query'yi temizler ve normalize eder."""
         # HTML entities ve özel karakterleri temizle
-        query = re.sub(r'&[a-zA-Z0-9#]+;', ' ', query)
+        query = self._HTML_ENT_RE.sub(' ', query)
         # Fazla boşlukları temizle
-        query = re.sub(r'\s+', ' ', query)
+        query = self._WS_RE.sub(' ', query)
         # Başındaki ve sonundaki boşlukları kaldır
         query = query.strip()
         return query
     
+    def _tokenize(self, text: str) -> List[str]:
+        """_WORD_RE.findall ile aynı kelimeleri döndürür."""
+        # Noktalama boşluğa çevrilip bölünür; geriye harf/rakam dışı bir şey
+        # kalırsa (ör. '_', semboller) regex ile tokenize edilir
+        words = text.translate(self._PUNCT_TABLE).split()
+        if all(word.isalnum() for word in words):
+            return words
+        return self._WORD_RE.findall(text)
+    
     def similarity(self, a: str, b: str) -> float:
-        """İki string arasındaki benzerliği hesaplar."""
-        return SequenceMatcher(None, a, b).ratio()
+        """İki string arasındaki benzerliği hesaplar (1 - edit mesafesi / uzunluk)."""
+        longest = max(len(a), len(b))
+        if longest == 0:
+            return 1.0
+        if min(len(a), len(b)) > _BP_MAX_LEN:
+            # Uzun string'ler için difflib
+            return SequenceMatcher(None, a, b).ratio()
+        return 1.0 - _bp_edit_distance(a, b) / longest
     
     def find_best_match(self, word: str, candidates: Set[str], threshold: float = 0.6) -> Optional[str]:
         """Verilen kelime için en iyi eşleşmeyi bulur."""
-        word = word.lower()
+        # Latin'e çevirmek karakter sayısını değiştirmez ve mesafeyi büyütmez,
+        # bu yüzden Latin formlarını bir kez karşılaştırmak yeterli
+        latin_word = self.to_latin(word.lower())
         best_match = None
         best_score = threshold
         
+        if candidates is self.dictionary:
+            word_len = len(latin_word)
+            # En uzun sözlük kelimesinden bile eşiği geçemeyecek kadar uzun kelimeler
+            if word_len > self._max_len and _max_similarity(word_len, self._max_len) <= best_score:
+                return None
+            
+            # Önce SymSpell silme indeksi; silme varyantları uzunluğun küpüyle büyür,
+            # 2 düzeltme içinde sözlük kelimesi olamayacak kadar uzun kelimede atlanır
+            if word_len <= self._max_len + _SYMSPELL_MAX_DELETES:
+                for candidate in self._symspell_lookup(latin_word):
+                    score = self.similarity(latin_word, self._latin_dict[candidate])
+                    if score > best_score:
+                        best_match = candidate
+                        best_score = score
+                if best_match:
+                    return best_match
+            
+            # Tam tarama: numba varsa derlenmiş bit-parallel çekirdek
+            if njit is not None and 0 < len(latin_word) <= _BP_MAX_LEN:
+                alpha_index, dict_codes, dict_lens = self._numba_tables
+                peq = np.zeros(len(alpha_index), dtype=np.uint64)
+                for i, ch in enumerate(latin_word):
+                    idx = alpha_index.get(ch)
+                    if idx is not None:
+                        peq[idx] |= np.uint64(1 << i)
+                best_idx, _ = _best_match_numba(peq, len(latin_word), dict_codes,
+                                                dict_lens, best_score)
+                return self._dict_tuple[best_idx] if best_idx >= 0 else None
+            
+            # Tam tarama, uzunluk kovaları üzerinden: kelimenin uzunluğundan dışa doğru,
+            # uzunluk farkı best_score'u geçmeyi imkansız kıldığında durulur
+            for delta in range(max(word_len, self._max_len) + 1):
+                lengths = [length for length in {word_len - delta, word_len + delta}
+                           if length > 0 and _max_similarity(word_len, length) > best_score]
+                if not lengths:
+                    break
+                for length in lengths:
+                    for candidate, latin_candidate in self._by_len.get(length, ()):
+                        score = self.similarity(latin_word, latin_candidate)
+                        if score > best_score:
+                            best_match = candidate
+                            best_score = score
+            return best_match
+        
+        word_len = len(latin_word)
+        matcher = None
         for candidate in candidates:
-            score = self.similarity(word, candidate)
+            # Sözlük kelimelerinin Latin formu zaten hesaplı
+            latin_candidate = self._latin_dict.get(candidate)
+            if latin_candidate is None:
+                latin_candidate = self.to_latin(candidate)
+            if min(word_len, len(latin_candidate)) > _BP_MAX_LEN:
+                # Uzun string'ler: difflib'in ucuz üst sınırları best_score'u
+                # geçmiyorsa ratio() hiç hesaplanmaz
+                if matcher is None:
+                    matcher = SequenceMatcher(None, latin_word, '')
+                matcher.set_seq2(latin_candidate)
+                if matcher.real_quick_ratio() <= best_score or matcher.quick_ratio() <= best_score:
+                    continue
+                score = matcher.ratio()
+            elif _max_similarity(word_len, len(latin_candidate)) <= best_score:
+                continue
+            else:
+                score = self.similarity(latin_word, latin_candidate)
             if score > best_score:
                 best_match = candidate
                 best_score = score
-            
-            # Latin karakterlerle de dene
-            latin_word = self.to_latin(word)
-            latin_candidate = self.to_latin(candidate)
-            score_latin = self.similarity(latin_word, latin_candidate)
-            if score_latin > best_score:
-                best_match = candidate
-                best_score = score_latin
         
         return best_match
     
     def correct_word(self, word: str) -> str:
         """Tek bir kelimeyi düzeltir."""
-        word = self.normalize_turkish(word)
+        return self._correct_word_scored(word)[0]
+    
+    def _correct_word_scored(self, word: str) -> Tuple[str, float]:
+        """Kelimeyi düzeltir ve (düzeltilmiş, benzerlik skoru) döndürür.
+        
+        Skor düzeltmeyle birlikte önbelleğe girer; confidence için tekrar hesaplanmaz.
+        """
+        original = word
+        word = sys.intern(self.normalize_turkish(word))
         
         # Önce direkt corrections'ta bak
         if word in self.corrections:
-            return self.corrections[word]
-        
+            corrected = self.corrections[word]
         # Dictionary'de tam eşleşme var mı?
-        if word in self.dictionary:
-            return word
-        
-        # Benzer kelime bul
-        best_match = self.find_best_match(word, self.dictionary)
-        if best_match:
-            return best_match
+        elif word in self.dictionary:
+            corrected = word
+        # Benzer kelime bul; bulunamazsa orijinali kalır
+        else:
+            corrected = self.find_best_match(word, self.dictionary) or word
         
-        # Değişiklik yapılamadı, orijinalini döndür
-        return word
+        if corrected.lower() == original.lower():
+            return corrected, 1.0
+        return corrected, self.similarity(original, corrected)
     
     def correct_query(self, query: str) -> Dict[str, any]:
         """
@@ -207,7 +456,48 @@ class TurkishSpellChecker:
             }
         
         # Kelimelere ayır
-        words = re.findall(r'\b\w+\b', query)
+        words = self._tokenize(query)
+        
+        # Hızlı yol: tüm kelimeler zaten sözlükteyse düzeltilecek bir şey yok
+        if all(len(word) < 2 or word.lower() in self.dictionary for word in words):
+            return {
+                'original': original_query,
+                'corrected': ' '.join(word if len(word) < 2 else word.lower() for word in words),
+                'corrections': [],
+                'confidence': 1.0
+            }
+        
+        mapping = {word: self._correct_word_scored(word) for word in set(words) if len(word) >= 2}
+        return self._assemble_result(original_query, words, mapping)
+
+    def correct_queries(self, queries: List[str]) -> List[Dict[str, any]]:
+        """
+        Birden çok query'yi toplu düzeltir.
+
+        Tüm query'lerdeki benzersiz kelimeler bir kez düzeltilir, sonuçlar
+        her query için correct_query ile aynı formatta yeniden oluşturulur.
+        """
+        cleaned = [self.clean_query(query) for query in queries]
+        tokens = [self._tokenize(query) if query else [] for query in cleaned]
+        unique = set(chain.from_iterable(tokens))
+        mapping = {word: self._correct_word_scored(word) for word in unique if len(word) >= 2}
+
+        results = []
+        for original_query, query, words in zip(queries, cleaned, tokens):
+            if not query:
+                results.append({
+                    'original': original_query,
+                    'corrected': '',
+                    'corrections': [],
+                    'confidence': 0.0
+                })
+            else:
+                results.append(self._assemble_result(original_query, words, mapping))
+        return results
+
+    def _assemble_result(self, original_query: str, words: List[str],
+                         mapping: Dict[str, Tuple[str, float]]) -> Dict[str, any]:
+        """Kelime -> (düzeltme, skor) eşlemesinden correct_query sonucunu oluşturur."""
         corrected_words = []
         corrections_made = []
         
@@ -216,14 +506,15 @@ class TurkishSpellChecker:
                 corrected_words.append(word)
                 continue
                 
-            corrected = self.correct_word(word)
+            corrected, score = mapping[word]
             corrected_words.append(corrected)
             
             if corrected.lower() != word.lower():
                 corrections_made.append({
                     'original': word,
                     'corrected': corrected,
-                    'position': len(corrected_words) - 1
+                    'position': len(corrected_words) - 1,
+                    'score': score
                 })
         
         corrected_query = ' '.join(corrected_words)
@@ -232,12 +523,8 @@ class TurkishSpellChecker:
         if not corrections_made:
             confidence = 1.0
         else:
-            # Her düzeltme için benzerlik skorunu hesapla
-            total_similarity = sum(
-                self.similarity(corr['original'], corr['corrected']) 
-                for corr in corrections_made
-            )
-            confidence = total_similarity / len(corrections_made) if corrections_made else 1.0
+            # Düzeltme sırasında hesaplanan skorların ortalaması
+            confidence = sum(corr['score'] for corr in corrections_made) / len(corrections_made)
         
         return {
             'original': original_query,
@@ -248,23 +535,29 @@ class TurkishSpellChecker:
     
     def suggest_alternatives(self, query: str, limit: int = 5) -> List[str]:
         """Query için alternatif öneriler sunar."""
-        words = re.findall(r'\b\w+\b', query.lower())
+        lowered = query.lower()
+        # Kelime -> query içindeki tüm geçişlerinin (başlangıç, bitiş) aralıkları
+        spans = {}
+        for match in self._WORD_RE.finditer(lowered):
+            spans.setdefault(match.group(), []).append(match.span())
         alternatives = set()
         
-        for word in words:
-            # Her kelime için benzer kelimeleri bul
-            candidates = []
-            for dict_word in self.dictionary:
-                similarity = self.similarity(word, dict_word)
-                if 0.3 < similarity < 0.9:  # Çok benzeri veya çok farklısı olmasın
-                    candidates.append((dict_word, similarity))
+        for word, word_spans in spans.items():
+            # Her kelime için çok benzeri olmayan en benzer 3 kelimeyi bul; eleme
+            # kesmeden önce yapılır, yoksa neredeyse aynı kelimeler ilk 3'ü doldurur
+            ranked = get_close_matches(word, self._dict_tuple, n=len(self._dict_tuple), cutoff=0.3)
+            candidates = [c for c in ranked if self.similarity(word, c) < 0.9][:3]
             
-            # En benzer 3'ünü al
-            candidates.sort(key=lambda x: x[1], reverse=True)
-            for candidate, _ in candidates[:3]:
-                new_query = query.lower()
-                new_query = re.sub(r'\b' + re.escape(word) + r'\b', candidate, new_query)
-                alternatives.add(new_query)
+            for candidate in candidates:
+                # Kelimenin tüm geçişlerini aday ile değiştirerek query'yi yeniden kur
+                parts = []
+                pos = 0
+                for start, end in word_spans:
+                    parts.append(lowered[pos:start])
+                    parts.append(candidate)
+                    pos = end
+                parts.append(lowered[pos:])
+                alternatives.add(''.join(parts))
         
         return list(alternatives)[:limit]
 